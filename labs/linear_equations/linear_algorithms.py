@@ -5,12 +5,45 @@ The python code heavily draws on Romero-Aguilar (2020, :cite:`CompEcon`) and
 Foster (2019, :cite:`foster2019`).
 
 """
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from scipy import sparse
+from scipy.sparse.linalg import spsolve_triangular
 
 eps = np.sqrt(np.spacing(1.0))
 
+# Default validation of the triangular structure in the substitution algorithms, see
+# :func:`forward_substitution` for the available modes.
+TRIANGULAR_CHECK = "full"
+
+# Number of rows inspected by the sampled validation of the triangular structure.
+SAMPLED_CHECK_ROWS = 32
+
+# Strategy exponent of the adaptive over-relaxation in :func:`gauss_seidel`. Observed
+# convergence rates of at most :math:`(\lambda - 1)^F` are taken to indicate that the current
+# parameter is at or beyond its optimum. Hageman and Young (1981, :cite:`hageman1981applied`)
+# (Chapter 9) recommend values of :math:`F` between 0.65 and 0.8, where larger values change
+# the parameter more often.
+SOR_STRATEGY_EXPONENT = 0.65
+
+# Number of iterations over which the average convergence rate of the adaptive over-relaxation
+# is measured to decide whether a parameter that may exceed its optimum is lowered. The first
+# window after each change of the parameter is skipped as transient.
+SOR_WINDOW = 5
 
-def forward_substitution(a, b):
+# Number of consecutive iterations with nearly equal ratios of the step norms after which the
+# convergence rate of the adaptive over-relaxation is considered settled. Beyond the optimal
+# parameter, the ratios oscillate, and they rarely agree in several consecutive iterations.
+SOR_SETTLED = 3
+
+
+def forward_substitution(a, b, out=None, unit_diagonal=False, check=None):
     """Perform forward substitution to solve a system of linear equations.
 
     Solves a linear equation of type :math:`Ax = b` when for a *lower triangular* matrix
@@ -21,80 +54,83 @@ def forward_substitution(a, b):
 
        x_i = \\left ( b_i - \\sum_{j=1}^{i-1} a_{ij}x_j \\right )/a_{ii}
 
+    Each step computes the sum as a single dot product of a row of :math:`A` with the part of
+    the solution that is already known. Several right-hand sides are handled at once by passing
+    them as the columns of :math:`b`.
 
     Parameters
     ----------
     a : numpy.ndarray
         Lower triangular matrix of dimension :math:`n \\times n`.
     b : numpy.ndarray
-        Vector of length :math:`n`.
+        Vector of length :math:`n` or matrix of dimension :math:`n \\times k`.
+    out : numpy.ndarray, default None
+        Array of type double with the same shape as :math:`b` in which the solution is stored.
+        May be :math:`b` itself. A new array is allocated if None.
+    unit_diagonal : bool
+        Whether to assume that the diagonal elements of :math:`A` are all one. The diagonal is
+        not accessed in this case.
+    check : str, default None
+        Validation of the triangular structure of :math:`A`. The options are
+
+        - ``"full"``: compare :math:`A` to its lower triangle element by element.
+        - ``"sampled"``: verify that the strictly upper part is exactly zero in a small,
+          evenly spaced sample of rows without allocating a second matrix.
+        - ``"none"``: skip the validation.
+
+        The module-level default ``TRIANGULAR_CHECK`` is used if None.
 
     Returns
     -------
     x : numpy.ndarray
-        Solution of the linear equations. Vector of length :math:`n`.
+        Solution of the linear equations with the same shape as :math:`b`.
 
     """
     # Test that only lower-triangular matrix passed in.
-    msg = "... function only intended for use with lower triangular matrix"
-    np.testing.assert_allclose(a, np.tril(a), err_msg=msg)
+    _check_triangular(a, lower=True, check=check)
 
-    # Get number of rows
-    n = a.shape[0]
-
-    # Allocating space for the solution vector
-    x = np.zeros_like(b, dtype=np.double)
-
-    # Here we perform the forward-substitution.
-    # Initializing  with the first row.
-    x[0] = b[0] / a[0, 0]
-
-    # Looping over remaining rows.
-    for i in range(1, n):
-        x[i] = (b[i] - np.dot(a[i, :i], x[:i])) / a[i, i]
-
-    return x
+    return _solve_lower(a, b, out, unit_diagonal)
 
 
-def backward_substitution(a, b):
+def backward_substitution(a, b, out=None, unit_diagonal=False, check=None):
     """Perform backward substitution to solve a system of linear equations.
 
     Solves a linear equation of type :math:`Ax = b` when for an *upper triangular* matrix
     :math:`A` of dimension :math:`n \\times n` and vector :math:`b` of length :math:`n`.
+    The backward substitution algorithm can be represented as:
+
+    .. math::
+
+       x_i = \\left ( b_i - \\sum_{j=i+1}^{n} a_{ij}x_j \\right )/a_{ii}
 
     Parameters
     ----------
     a : numpy.ndarray
-        Lower triangular matrix of dimension :math:`n \\times n`.
+        Upper triangular matrix of dimension :math:`n \\times n`.
     b : numpy.ndarray
-        Vector of length :math:`n`.
+        Vector of length :math:`n` or matrix of dimension :math:`n \\times k`.
+    out : numpy.ndarray, default None
+        Array of type double with the same shape as :math:`b` in which the solution is stored.
+        May be :math:`b` itself. A new array is allocated if None.
+    unit_diagonal : bool
+        Whether to assume that the diagonal elements of :math:`A` are all one. The diagonal is
+        not accessed in this case.
+    check : str, default None
+        Validation of the triangular structure of :math:`A`, see :func:`forward_substitution`.
 
     Returns
     -------
     x : numpy.ndarray
-        Solution of the linear equations. Vector of length :math:`n`.
+        Solution of the linear equations with the same shape as :math:`b`.
 
     """
     # Test that only uppper triangular matrix passed in.
-    msg = "... function only intended for use with upper triangular matrix"
-    np.testing.assert_allclose(a, np.triu(a), err_msg=msg)
-
-    # Get number of rows.
-    n = a.shape[0]
+    _check_triangular(a, lower=False, check=check)
 
-    x = np.zeros(n)
+    return _solve_upper(a, b, out, unit_diagonal)
 
-    for i in range(n - 1, -1, -1):
-        tmp = b[i]
-        for j in range(n - 1, i, -1):
-            tmp -= x[j] * a[i, j]
-
-        x[i] = tmp / a[i, i]
-
-    return x
 
-
-def solve(a, b):
+def solve(a, b, assume_a="gen", mixed_precision=False, max_refinements=10, return_info=False):
     """Solve linear equations using L-U factorization.
 
     Solves a linear equation of type :math:`Ax = b` when for a nonsingular square matrix
@@ -105,9 +141,9 @@ def solve(a, b):
 
     Two stages of the L-U algorithm:
 
-    1. Factorization using Gaussian elimination: :math:`A=LU` where :math:`L` denotes
-    a row-permuted lower triangular matrix. :math:`U` denotes a row-permuted upper
-    triangular matrix.
+    1. Factorization using Gaussian elimination with partial pivoting: :math:`A=LU` where
+    :math:`L` denotes a row-permuted lower triangular matrix and :math:`U` denotes an upper
+    triangular matrix. See :func:`lu_factor` for details.
 
     2. Solution using forward and backward substitution. The factored linear equation of step 1 can
     be expressed as
@@ -119,17 +155,46 @@ def solve(a, b):
     The forward substitution algorithm solves :math:`Ly = b` for y. The backward substitution
     algorithm then solves :math:`Ux = y` for :math:`x`.
 
+    In mixed precision, the factorization is computed in single precision, which halves the
+    memory traffic. The solution is then improved by iterative refinement, where the residual
+    :math:`r = b - Ax` is computed in double precision and the correction solves :math:`Ad = r`
+    using the single precision factorization. If the refinement does not reach double precision
+    accuracy, for example because :math:`A` is too ill-conditioned, the factorization is
+    recomputed in double precision. This is also the case if the estimated condition number
+    shows that the refinement cannot converge.
+
+    Symmetric matrices can instead be factorized by :func:`cholesky` or :func:`ldl`, which
+    require half the operations and memory. If the Cholesky factorization reveals that
+    :math:`A` is not positive definite, or the LDL factorization, which does not pivot,
+    encounters a zero pivot, the L-U factorization is used instead.
+
     Parameters
     ----------
     a : numpy.ndarray
         Matrix of dimension :math:`n \\times n`
     b : numpy.ndarray
         Vector of length :math:`n`.
+    assume_a : str
+        Structure of :math:`A`, either ``"gen"`` for a general matrix, ``"sym"`` for a
+        symmetric matrix, or ``"pos"`` for a symmetric positive definite matrix. Only the lower
+        triangle of symmetric matrices is accessed.
+    mixed_precision : bool
+        Whether to factorize in single precision and refine the solution in double precision.
+    max_refinements : int
+        Maximum number of refinement steps in mixed precision.
+    return_info : bool
+        Whether to return information on the solution process.
 
     Returns
     -------
     x : numpy.ndarray
         Solution of the linear equations. Vector of length :math:`n`.
+    info : dict
+        Only returned if `return_info` is True. The entry ``"refinement_steps"`` holds the
+        number of refinement steps and ``"fallback"`` whether the factorization was recomputed
+        in double precision or the Cholesky or LDL factorization failed. The entry
+        ``"condition"`` holds an estimate of the condition number in the 1-norm, see
+        :func:`estimate_condition`.
 
     Example
     -------
@@ -139,17 +204,100 @@ def solve(a, b):
     array([0.25, 1.  , 1.5 ])
 
     """
-    # Step 1: Factorization using a naive implementation of the LU decomposition.
-    l, u = naive_lu(a)
+    info = {"refinement_steps": 0, "fallback": False}
+
+    if assume_a not in ["gen", "sym", "pos"]:
+        raise ValueError(f"Unknown structure {assume_a!r}, use 'gen', 'sym', or 'pos'.")
+
+    if assume_a == "pos":
+        try:
+            apply = apply_transposed = partial(cholesky_solve, cholesky(a))
+        except np.linalg.LinAlgError:
+            info["fallback"] = True
+            assume_a = "gen"
+    elif assume_a == "sym":
+        try:
+            apply = apply_transposed = partial(ldl_solve, ldl(a))
+        except np.linalg.LinAlgError:
+            info["fallback"] = True
+            assume_a = "gen"
+
+    if assume_a == "gen" and mixed_precision:
+        x = _solve_mixed_precision(a, b, max_refinements, info)
+    else:
+        if assume_a == "gen":
+            # Step 1: Factorization using Gaussian elimination with partial pivoting.
+            factorization = lu_factor(a)
+            apply = partial(lu_solve, factorization)
+            apply_transposed = partial(lu_solve, factorization, trans=True)
 
-    # Step 2: Solution using forward and backward substitution.
-    y = forward_substitution(l, b)
-    x = backward_substitution(u, y)
+        # Step 2: Solution using forward and backward substitution.
+        x = apply(b)
+
+        if return_info:
+            info["condition"] = _estimate_condition(a, apply, apply_transposed)
+
+    if return_info:
+        return x, info
 
     return x
 
 
-def gauss_seidel(a, b, x0=None, lambda_=1.0, max_iterations=1000, tolerance=eps):
+def _solve_mixed_precision(a, b, max_refinements, info):
+    """Solve in single precision and refine the solution in double precision."""
+    a = np.asarray(a, dtype=np.double)
+    b = np.asarray(b, dtype=np.double)
+
+    # The refinement is considered converged at the accuracy of a backward stable solver.
+    threshold = np.sqrt(a.shape[0]) * np.finfo(np.double).eps * np.linalg.norm(a, np.inf)
+
+    try:
+        factorization = lu_factor(a, dtype=np.single)
+    except np.linalg.LinAlgError:
+        factorization = None
+
+    if factorization is not None and np.isfinite(factorization[0]).all():
+        info["condition"] = estimate_condition(a, factorization)
+
+    # The refinement cannot converge if the condition exceeds the single precision accuracy.
+    if info.get("condition", np.inf) * np.finfo(np.single).eps < 1:
+        x = lu_solve(factorization, b).astype(np.double)
+        previous = np.inf
+        for step in range(max_refinements + 1):
+            r = b - a @ x
+            residual = np.linalg.norm(r, np.inf)
+            if residual <= threshold * np.linalg.norm(x, np.inf):
+                return x
+
+            # Stop as soon as the refinement fails to reduce the residual.
+            if step == max_refinements or not residual < previous:
+                break
+
+            x += lu_solve(factorization, r)
+            info["refinement_steps"] += 1
+            previous = residual
+
+    info["fallback"] = True
+
+    factorization = lu_factor(a)
+    info["condition"] = estimate_condition(a, factorization)
+
+    return lu_solve(factorization, b)
+
+
+def gauss_seidel(
+    a,
+    b,
+    x0=None,
+    lambda_=1.0,
+    max_iterations=1000,
+    tolerance=eps,
+    return_result=False,
+    adaptive=False,
+    ordering="natural",
+    n_blocks=None,
+    n_workers=None,
+):
     """Solves linear equation of type :math:`Ax = b` using Gauss-Seidel iterations.
 
     In the linear equation, :math:`A` denotes a matrix of dimension
@@ -172,81 +320,1398 @@ def gauss_seidel(a, b, x0=None, lambda_=1.0, max_iterations=1000, tolerance=eps)
        x^{(k+1)} \\leftarrow Q^{-1}b + (I - Q^{-1}A)x^{(k)}
 
     which, if convergent, must converge to a solution of the linear equation. For the Gauss-Seidel
-    method, :math:`Q` is the upper triangular matrix formed from the upper triangular elements of
-    :math:`A`.
+    method, :math:`Q` is the lower triangular matrix formed from the lower triangular elements of
+    :math:`A`. Each iteration is carried out as a sweep of :func:`sor_sweep`, which only touches
+    the nonzero elements of :math:`A`. Sparse matrices are thus never converted to dense ones.
+
+    The natural ordering visits the rows one after another, so that a sweep cannot be split
+    across processors. Two orderings lift this restriction. The multicolor ordering
+    (:func:`multicolor_sor_sweep`) updates all rows of the same color at once, for example the
+    red and the black points of a stencil. The block ordering (:func:`block_sor_sweep`) performs
+    a Gauss-Seidel sweep within row blocks that are processed concurrently by a pool of threads
+    and couples the blocks by a Jacobi iteration.
+
+    The optimal over-relaxation parameter is :math:`\\lambda^* = 2 / (1 + \\sqrt{1 - \\rho^2})`,
+    where :math:`\\rho` denotes the spectral radius of the Gauss-Jacobi iteration matrix, and
+    usually is not known. The adaptive mode estimates :math:`\\rho` from the ratio of the norms
+    of successive steps once it has settled (Hageman and Young, 1981,
+    :cite:`hageman1981applied`, Chapter 9). It increases :math:`\\lambda` towards the
+    estimate of :math:`\\lambda^*` as long as the convergence is clearly slower than the
+    rate :math:`\\lambda - 1` attainable at the optimum. A starting value that has not been
+    confirmed by such an estimate may exceed :math:`\\lambda^*`, in which case the rate equals
+    :math:`\\lambda - 1` and reveals nothing about :math:`\\rho`. If the average rate over a
+    few iterations is close to :math:`\\lambda - 1`, or the iteration stalls, the distance of
+    :math:`\\lambda` to two is thus doubled until the rate allows a new estimate.
 
     Parameters
     ----------
-    a : numpy.ndarray
-        Matrix of dimension :math:`n \\times n`
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`. Sparse matrices in any format, for example CSR
+        or banded (DIA) storage, are supported.
     b : numpy.ndarray
         Vector of length :math:`n`.
     x0 : numpy.ndarray, default None
-        Array of starting values. Set to be if None.
+        Array of starting values, which is updated in place. Set to :math:`b` if None.
     lambda_ : float
         Over-relaxation parameter which may accelerate convergence of the algorithm
-        for :math:`1 < \\lambda < 2`.
+        for :math:`1 < \\lambda < 2`. Starting value in the adaptive mode, for example the
+        value found in the solution of a similar problem.
     max_iterations : int
         Maximum number of iterations.
     tolerance : float
         Convergence tolerance.
+    return_result : bool
+        Whether to return an :class:`IterativeResult` with the convergence history instead of
+        the solution only.
+    adaptive : bool
+        Whether to adapt the over-relaxation parameter during the iteration.
+    ordering : str
+        Order in which the rows are updated, one of "natural", "multicolor", or "block".
+    n_blocks : int, default None
+        Number of row blocks for the block ordering. Set to the number of workers if None.
+    n_workers : int, default None
+        Number of threads for the block ordering. Set to the number of processors if None.
 
     Returns
     -------
-    x : numpy.ndarray
+    x : numpy.ndarray or IterativeResult
         Solution of the linear equations. Vector of length :math:`n`.
 
 
     Raises
     ------
     StopIteration
-        If maximum number of iterations specified by `max_iterations` is reached.
+        If maximum number of iterations specified by `max_iterations` is reached and
+        `return_result` is False.
 
     """
     if x0 is None:
-        x = b.copy()
+        x = np.array(b, dtype=np.double)
     else:
         x = x0
 
-    q = np.tril(a)
-    for _ in range(max_iterations):
-        dx = np.linalg.solve(q, b - a @ x)
-        x += lambda_ * dx
+    result = IterativeResult(x, max_iterations) if return_result else None
 
-        if np.linalg.norm(dx) < tolerance:
-            return x
+    if ordering == "natural":
+        sweep = partial(sor_sweep, sor_splitting(a))
+    elif ordering == "multicolor":
+        sweep = partial(multicolor_sor_sweep, multicolor_splitting(a))
+    elif ordering == "block":
+        n_workers = os.cpu_count() if n_workers is None else n_workers
+        n_blocks = n_workers if n_blocks is None else n_blocks
+        sweep = partial(block_sor_sweep, block_splitting(a, n_blocks))
+    else:
+        raise ValueError(f"Unknown ordering: {ordering}.")
+
+    pool = ThreadPoolExecutor(n_workers) if ordering == "block" else nullcontext()
+    with pool as executor:
+        if executor is not None:
+            sweep = partial(sweep, executor=executor)
+
+        step, ratio, iterations_at_lambda = np.inf, np.nan, 0
+        lambda_safe, recent_steps, settled = 1.0, deque(maxlen=SOR_WINDOW + 1), 0
+        for _ in range(max_iterations):
+            dx = sweep(b, x, lambda_)
+            step, step_old = np.linalg.norm(dx), step
+
+            if result is not None:
+                result.record(np.linalg.norm(b - a @ x), step)
+                result.lambda_ = lambda_
+
+            if adaptive:
+                ratio, ratio_old = step / step_old, ratio
+                iterations_at_lambda += 1
+                if iterations_at_lambda == 1:
+                    recent_steps.clear()
+                recent_steps.append(step)
+
+                if abs(ratio - ratio_old) < 1e-3 * (1 - ratio):
+                    settled += 1
+                else:
+                    settled = 0
+                if iterations_at_lambda >= 3 and settled >= SOR_SETTLED:
+                    lambda_new = _adapt_relaxation(lambda_, ratio)
+                    if lambda_new > lambda_:
+                        lambda_safe = lambda_new
+                        lambda_, iterations_at_lambda, settled = lambda_new, 0, 0
+                        continue
+
+                if lambda_ > lambda_safe and iterations_at_lambda >= 2 * SOR_WINDOW:
+                    rate = (step / recent_steps[0]) ** (1 / SOR_WINDOW)
+                    lambda_new = _lower_relaxation(lambda_, rate)
+                    if lambda_new < lambda_:
+                        lambda_, iterations_at_lambda, settled = lambda_new, 0, 0
+
+            if step < tolerance:
+                return x if result is None else result.finish(converged=True)
+
+    if result is not None:
+        return result.finish(converged=False)
 
     raise StopIteration
 
 
+class IterativeResult:
+    """Result of an iterative solver for linear equations with its convergence history.
+
+    The norms of the residual :math:`b - Ax^{(k)}` and of the step
+    :math:`x^{(k)} - x^{(k-1)}` are recorded in a buffer that is allocated once for the maximum
+    number of iterations. The iterate with the smallest residual norm is kept in a second
+    buffer, so that the work is not lost if the solver fails to converge.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Iterate of the solver, which is updated in place by the solver.
+    max_iterations : int
+        Maximum number of iterations of the solver.
+
+    Attributes
+    ----------
+    x : numpy.ndarray
+        Solution of the linear equations if the solver converged and the iterate with the
+        smallest residual norm otherwise.
+    converged : bool
+        Whether the solver converged.
+    iterations : int
+        Number of iterations.
+    lambda_ : float or None
+        Over-relaxation parameter in the last iteration if the solver uses one.
+
+    """
+
+    def __init__(self, x, max_iterations):
+        """Allocate the buffers for the convergence history."""
+        self.x = x
+        self.converged = False
+        self.iterations = 0
+        self.lambda_ = None
+
+        self._history = np.full((max_iterations, 2), np.nan)
+        self._best_x = np.array(x, dtype=np.double)
+        self._best_residual_norm = np.inf
+
+    @property
+    def residual_norms(self):
+        """Norms of the residuals after each iteration."""
+        return self._history[: self.iterations, 0]
+
+    @property
+    def step_norms(self):
+        """Norms of the steps in each iteration."""
+        return self._history[: self.iterations, 1]
+
+    def record(self, residual_norm, step_norm):
+        """Record the norms of the residual and the step of an iteration."""
+        self._history[self.iterations] = residual_norm, step_norm
+        self.iterations += 1
+
+        if residual_norm < self._best_residual_norm:
+            self._best_residual_norm = residual_norm
+            self._best_x[...] = self.x
+
+    def finish(self, converged):
+        """Mark the end of the iteration and select the iterate to report."""
+        self.converged = converged
+        if not converged:
+            self.x = self._best_x
+
+        return self
+
+
+def sor_splitting(a):
+    """Split a matrix for Gauss-Seidel and successive over-relaxation (SOR) sweeps.
+
+    The matrix is decomposed as :math:`A = L + D + U` into its strictly lower triangular part
+    :math:`L`, its diagonal :math:`D`, and its strictly upper triangular part :math:`U`. The
+    triangular parts are stored in compressed sparse row (CSR) format so that a sweep costs
+    :math:`O(\\text{nnz})` operations.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+
+    Returns
+    -------
+    splitting : tuple
+        Tuple ``(lower, diagonal, upper)`` of the strictly lower part in CSR format, the diagonal
+        as a vector, and the strictly upper part in CSR format.
+
+    """
+    a = sparse.csr_matrix(a, dtype=np.double)
+
+    lower = sparse.tril(a, -1, format="csr")
+    diagonal = a.diagonal()
+    upper = sparse.triu(a, 1, format="csr")
+
+    return lower, diagonal, upper
+
+
+def sor_sweep(splitting, b, x, lambda_=1.0, reverse=False):
+    """Perform a single Gauss-Seidel or SOR sweep in place.
+
+    The sweep visits the rows in order and updates each element of :math:`x` using the elements
+    that were already updated in the same sweep,
+
+    .. math::
+
+       x_i \\leftarrow (1 - \\lambda) x_i + \\frac{\\lambda}{a_{ii}} \\left ( b_i
+       - \\sum_{j < i} a_{ij} x_j - \\sum_{j > i} a_{ij} x_j \\right ).
+
+    In matrix notation, this is the triangular system
+    :math:`(D + \\lambda L) x^{(k+1)} = \\lambda (b - U x^{(k)}) + (1 - \\lambda) D x^{(k)}`,
+    which is solved by sparse forward substitution. Setting :math:`\\lambda = 1` gives a
+    Gauss-Seidel sweep. A reverse sweep visits the rows in the opposite order, so that the roles
+    of :math:`L` and :math:`U` are interchanged. A forward sweep followed by a reverse sweep is
+    symmetric.
+
+    Parameters
+    ----------
+    splitting : tuple
+        Splitting of the matrix as returned by :func:`sor_splitting`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x : numpy.ndarray
+        Current iterate of type double, updated in place.
+    lambda_ : float
+        Over-relaxation parameter.
+    reverse : bool
+        Whether to visit the rows in reverse order.
+
+    Returns
+    -------
+    dx : numpy.ndarray
+        Change of the iterate during the sweep.
+
+    """
+    lower, diagonal, upper = splitting
+    if reverse:
+        lower, upper = upper, lower
+
+    rhs = lambda_ * (b - upper @ x) + (1 - lambda_) * diagonal * x
+    q = (lambda_ * lower + sparse.diags(diagonal)).tocsr()
+
+    dx = spsolve_triangular(q, rhs, lower=not reverse) - x
+    x += dx
+
+    return dx
+
+
+def get_coloring(a):
+    """Color the rows of a matrix such that rows of the same color are not coupled.
+
+    Two rows :math:`i` and :math:`j` are coupled if :math:`a_{ij} \\neq 0` or
+    :math:`a_{ji} \\neq 0`. The rows are colored greedily in their natural order with the
+    smallest color not used by any coupled row. For the standard finite difference stencils,
+    this gives the red-black (checkerboard) coloring.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+
+    Returns
+    -------
+    colors : numpy.ndarray
+        Color of each row, numbered from zero. Vector of length :math:`n`.
+
+    Example
+    -------
+    >>> a = np.array([[2, -1, 0], [-1, 2, -1], [0, -1, 2]])
+    >>> get_coloring(a)
+    array([0, 1, 0])
+
+    """
+    a = abs(sparse.csr_matrix(a))
+    pattern = (a + a.T).tocsr()
+    indptr, indices = pattern.indptr, pattern.indices
+
+    colors = np.full(pattern.shape[0], -1)
+    for i in range(pattern.shape[0]):
+        used = set(colors[indices[indptr[i] : indptr[i + 1]]])
+        color = 0
+        while color in used:
+            color += 1
+        colors[i] = color
+
+    return colors
+
+
+def multicolor_splitting(a, colors=None):
+    """Split a matrix into groups of uncoupled rows for multicolor SOR sweeps.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+    colors : numpy.ndarray, default None
+        Color of each row such that rows of the same color are not coupled, for example the
+        parity of the grid points of a stencil. Computed by :func:`get_coloring` if None.
+
+    Returns
+    -------
+    splitting : tuple
+        Tuple ``(groups, diagonal)`` of a list of pairs with the indices of the rows of each
+        color and these rows in CSR format, and the diagonal as a vector.
+
+    """
+    a = sparse.csr_matrix(a, dtype=np.double)
+    if colors is None:
+        colors = get_coloring(a)
+
+    groups = []
+    for color in np.unique(colors):
+        rows = np.flatnonzero(colors == color)
+        groups.append((rows, a[rows]))
+
+    return groups, a.diagonal()
+
+
+def multicolor_sor_sweep(splitting, b, x, lambda_=1.0, reverse=False):
+    """Perform a single multicolor Gauss-Seidel or SOR sweep in place.
+
+    The sweep visits the colors in order. Since rows of the same color are not coupled, all
+    their elements of :math:`x` are updated at once by a sparse matrix-vector product,
+
+    .. math::
+
+       x_c \\leftarrow x_c + \\lambda D_c^{-1} (b_c - A_c x),
+
+    where :math:`A_c` are the rows of color :math:`c`. The iteration differs from the natural
+    ordering of :func:`sor_sweep` only by a permutation of the rows and converges at a
+    comparable rate.
+
+    Parameters
+    ----------
+    splitting : tuple
+        Splitting of the matrix as returned by :func:`multicolor_splitting`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x : numpy.ndarray
+        Current iterate of type double, updated in place.
+    lambda_ : float
+        Over-relaxation parameter.
+    reverse : bool
+        Whether to visit the colors in reverse order.
+
+    Returns
+    -------
+    dx : numpy.ndarray
+        Change of the iterate during the sweep.
+
+    """
+    groups, diagonal = splitting
+
+    dx = np.empty_like(x)
+    for rows, a_rows in reversed(groups) if reverse else groups:
+        dx[rows] = lambda_ * (b[rows] - a_rows @ x) / diagonal[rows]
+        x[rows] += dx[rows]
+
+    return dx
+
+
+def block_splitting(a, n_blocks):
+    """Split a matrix into row blocks for block SOR sweeps.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+    n_blocks : int
+        Number of row blocks of roughly equal size.
+
+    Returns
+    -------
+    splitting : tuple
+        Tuple ``(off_block, blocks)`` of the elements outside the diagonal blocks in CSR format
+        and a list of pairs with the slice of each block and the splitting of its diagonal block
+        as returned by :func:`sor_splitting`.
+
+    """
+    a = sparse.csr_matrix(a, dtype=np.double)
+
+    bounds = np.linspace(0, a.shape[0], min(n_blocks, a.shape[0]) + 1).astype(int)
+    slices = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    block_diagonal = sparse.block_diag([a[s, s] for s in slices], format="csr")
+    off_block = (a - block_diagonal).tocsr()
+    blocks = [(s, sor_splitting(a[s, s])) for s in slices]
+
+    return off_block, blocks
+
+
+def block_sor_sweep(splitting, b, x, lambda_=1.0, executor=None):
+    """Perform a single block Gauss-Seidel or SOR sweep in place.
+
+    The coupling between the blocks is moved to the right-hand side using the iterate at the
+    beginning of the sweep (block Jacobi). Each block then performs a sweep of
+    :func:`sor_sweep` on its diagonal block. The blocks are independent of each other and write
+    to disjoint parts of :math:`x`, so they can be processed concurrently. The convergence
+    approaches that of :func:`sor_sweep` as the coupling between the blocks becomes weak
+    relative to the coupling within them.
+
+    Parameters
+    ----------
+    splitting : tuple
+        Splitting of the matrix as returned by :func:`block_splitting`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x : numpy.ndarray
+        Current iterate of type double, updated in place.
+    lambda_ : float
+        Over-relaxation parameter.
+    executor : concurrent.futures.Executor, default None
+        Executor that processes the blocks, for example a thread pool sharing :math:`x`. The
+        blocks are processed one after another if None.
+
+    Returns
+    -------
+    dx : numpy.ndarray
+        Change of the iterate during the sweep.
+
+    """
+    off_block, blocks = splitting
+    rhs = b - off_block @ x
+
+    def sweep_block(block):
+        rows, splitting_ = block
+        return sor_sweep(splitting_, rhs[rows], x[rows], lambda_)
+
+    map_ = map if executor is None else executor.map
+
+    return np.concatenate(list(map_(sweep_block, blocks)))
+
+
 def naive_lu(a):
-    """Apply a naive LU factorization.
+    """Apply an LU factorization with partial pivoting.
 
-    LU factorization decomposes a matrix :math:`A` into a lower triangular matrix :math:`L`
-    and upper triangular matrix `U`. The naive LU factorization does not apply permutations to
-    the resulting matrices and thus only works reliably for diagonal matrices :math:`A`:
+    LU factorization decomposes a matrix :math:`A` into a row-permuted lower triangular matrix
+    :math:`L` and an upper triangular matrix :math:`U` such that :math:`A = LU`. The work is done
+    by :func:`lu_factor`, this function only unpacks its compact storage into two separate
+    matrices.
 
     Parameters
     ----------
     a : numpy.ndarray
-        Diagonal square matrix.
+        Nonsingular square matrix.
 
     Returns
     -------
     l : numpy.ndarray
+        Row-permuted lower triangular matrix.
     u : numpy.ndarray
+        Upper triangular matrix.
+
+    Example
+    -------
+    >>> a = np.array([[1e-17, 1.0], [1.0, 1.0]])
+    >>> l, u = naive_lu(a)
+    >>> np.allclose(l @ u, a)
+    True
 
     """
-    n = a.shape[0]
-    u = a.copy()
-    l = np.eye(n)
-    for j in range(n - 1):
-        lam = np.eye(n)
-        gamma = u[j + 1 :, j] / u[j, j]
-        lam[j + 1 :, j] = -gamma
-        u = lam @ u
+    lu, piv = lu_factor(a)
+    n = lu.shape[0]
 
-        lam[j + 1 :, j] = gamma
-        l = l @ lam
+    l = np.empty_like(lu)
+    l[piv] = np.tril(lu, -1) + np.eye(n)
+    u = np.triu(lu)
 
     return l, u
+
+
+def lu_factor(a, overwrite_a=False, block_size=64, dtype=np.double):
+    """Compute the LU factorization of a matrix using partial pivoting.
+
+    The factorization :math:`PA = LU` is computed by Gaussian elimination with partial pivoting.
+    Each column is eliminated with a rank-1 update of a single working array. The columns are
+    processed in panels of width ``block_size``, and the trailing submatrix is updated with one
+    rank-k matrix product per panel. The row interchanges are recorded in a permutation vector
+    instead of a permutation matrix.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Nonsingular square matrix of dimension :math:`n \\times n`.
+    overwrite_a : bool
+        Whether to overwrite :math:`A` with its factorization. This only avoids a copy if
+        :math:`A` is already an array of type `dtype`.
+    block_size : int
+        Number of columns per panel.
+    dtype : numpy.dtype
+        Floating point type in which the factorization is computed.
+
+    Returns
+    -------
+    lu : numpy.ndarray
+        Matrix of dimension :math:`n \\times n` holding :math:`U` in its upper triangle and the
+        strictly lower part of :math:`L` below the diagonal. The unit diagonal of :math:`L` is
+        not stored.
+    piv : numpy.ndarray
+        Permutation vector of length :math:`n` such that ``a[piv]`` equals :math:`LU`.
+
+    Raises
+    ------
+    numpy.linalg.LinAlgError
+        If :math:`A` is singular.
+
+    Example
+    -------
+    >>> a = np.array([[1.0, 2.0], [3.0, 4.0]])
+    >>> lu, piv = lu_factor(a)
+    >>> piv
+    array([1, 0])
+    >>> lu
+    array([[3.        , 4.        ],
+           [0.33333333, 0.66666667]])
+
+    """
+    if overwrite_a:
+        lu = np.asarray(a, dtype=dtype)
+    else:
+        lu = np.array(a, dtype=dtype)
+
+    n = lu.shape[0]
+    piv = np.arange(n)
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+
+        # Factorize the current panel using rank-1 updates, interchanging complete rows.
+        for k in range(start, stop):
+            p = k + np.argmax(np.abs(lu[k:, k]))
+            if lu[p, k] == 0:
+                raise np.linalg.LinAlgError("Singular matrix")
+
+            if p != k:
+                lu[[k, p]] = lu[[p, k]]
+                piv[[k, p]] = piv[[p, k]]
+
+            lu[k + 1 :, k] /= lu[k, k]
+            lu[k + 1 :, k + 1 : stop] -= np.outer(lu[k + 1 :, k], lu[k, k + 1 : stop])
+
+        # Compute the block row of U to the right of the panel.
+        for k in range(start, stop - 1):
+            lu[k + 1 : stop, stop:] -= np.outer(lu[k + 1 : stop, k], lu[k, stop:])
+
+        # Rank-k update of the trailing submatrix.
+        lu[stop:, stop:] -= lu[stop:, start:stop] @ lu[start:stop, stop:]
+
+    return lu, piv
+
+
+def lu_solve(factorization, b, trans=False):
+    """Solve linear equations using a precomputed LU factorization.
+
+    Parameters
+    ----------
+    factorization : tuple
+        Tuple ``(lu, piv)`` as returned by :func:`lu_factor`.
+    b : numpy.ndarray
+        Vector of length :math:`n` or matrix of dimension :math:`n \\times k`.
+    trans : bool
+        Whether to solve the transposed equations :math:`A^Tx = b` instead.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations with the same shape as :math:`b`.
+
+    """
+    lu, piv = factorization
+
+    if trans:
+        # Solve U^T L^T P x = b with the transposed triangles and undo the permutation.
+        y = np.array(b, dtype=lu.dtype)
+        _solve_lower(lu.T, y, out=y)
+        _solve_upper(lu.T, y, out=y, unit_diagonal=True)
+
+        x = np.empty_like(y)
+        x[piv] = y
+    else:
+        # The permuted copy of the right-hand side is overwritten by both substitutions.
+        x = np.asarray(b, dtype=lu.dtype)[piv]
+        _solve_lower(lu, x, out=x, unit_diagonal=True)
+        _solve_upper(lu, x, out=x)
+
+    return x
+
+
+def estimate_condition(a, factorization=None):
+    """Estimate the condition number of a matrix in the 1-norm.
+
+    The condition number :math:`\\kappa_1(A) = \\|A\\|_1 \\|A^{-1}\\|_1` measures how
+    sensitive the solution of linear equations is to perturbations. Computing it exactly
+    requires the inverse or a singular value decomposition. The estimator by Hager (1984,
+    :cite:`hager1984condition`) with the refinements by Higham (1988, :cite:`higham1988fortran`)
+    instead maximizes :math:`\\|A^{-1}x\\|_1` over the unit ball by a few steps of a gradient
+    method. Each step requires one solve with :math:`A` and one with :math:`A^T`, so the estimate
+    costs :math:`O(n^2)` operations given an LU factorization. The estimate is a lower bound,
+    which is almost always within a factor of a few of the condition number.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Nonsingular square matrix of dimension :math:`n \\times n`.
+    factorization : tuple, default None
+        Tuple ``(lu, piv)`` as returned by :func:`lu_factor`. Computed if None.
+
+    Returns
+    -------
+    condition : float
+        Estimate of the condition number in the 1-norm.
+
+    Example
+    -------
+    >>> a = np.array([[1.0, 2.0], [3.0, 4.0]])
+    >>> round(estimate_condition(a), 8)
+    21.0
+
+    """
+    if factorization is None:
+        factorization = lu_factor(a)
+
+    apply = partial(lu_solve, factorization)
+    apply_transposed = partial(lu_solve, factorization, trans=True)
+
+    return _estimate_condition(a, apply, apply_transposed)
+
+
+def cholesky(a, overwrite_a=False, block_size=64):
+    """Compute the Cholesky factorization of a symmetric positive definite matrix.
+
+    The factorization :math:`A = LL^T` with a lower triangular matrix :math:`L` exists if and
+    only if :math:`A` is symmetric positive definite. Only the lower triangle of :math:`A` is
+    accessed and only the lower triangle of :math:`L` is computed, which requires half the
+    operations of :func:`lu_factor`. The columns are processed in panels of width
+    ``block_size`` and the trailing lower triangle is updated by one matrix product per block
+    column. The factorization stops at the first nonpositive pivot, so that a failure is
+    detected at the cost of the factorization up to that column.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Symmetric positive definite matrix of dimension :math:`n \\times n`.
+    overwrite_a : bool
+        Whether to overwrite :math:`A` with its factorization. This only avoids a copy if
+        :math:`A` is already an array of type double.
+    block_size : int
+        Number of columns per panel.
+
+    Returns
+    -------
+    l : numpy.ndarray
+        Lower triangular matrix :math:`L` of dimension :math:`n \\times n`.
+
+    Raises
+    ------
+    numpy.linalg.LinAlgError
+        If :math:`A` is not positive definite.
+
+    Example
+    -------
+    >>> cholesky(np.array([[4.0, 2.0], [2.0, 5.0]]))
+    array([[2., 0.],
+           [1., 2.]])
+
+    """
+    return _factor_symmetric(a, overwrite_a, block_size, cholesky=True)
+
+
+def ldl(a, overwrite_a=False, block_size=64):
+    """Compute the LDL factorization of a symmetric matrix.
+
+    The factorization :math:`A = LDL^T` with a unit lower triangular matrix :math:`L` and a
+    diagonal matrix :math:`D` avoids the square roots of :func:`cholesky` and also applies to
+    symmetric indefinite matrices. It uses no pivoting, so it is only stable if :math:`A` is, for
+    example, positive definite or diagonally dominant. Only the lower triangle of :math:`A` is
+    accessed.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Symmetric matrix of dimension :math:`n \\times n`.
+    overwrite_a : bool
+        Whether to overwrite :math:`A` with its factorization. This only avoids a copy if
+        :math:`A` is already an array of type double.
+    block_size : int
+        Number of columns per panel.
+
+    Returns
+    -------
+    l : numpy.ndarray
+        Unit lower triangular matrix :math:`L` of dimension :math:`n \\times n`.
+    d : numpy.ndarray
+        Diagonal of :math:`D`. Vector of length :math:`n`.
+
+    Raises
+    ------
+    numpy.linalg.LinAlgError
+        If a zero pivot is encountered.
+
+    Example
+    -------
+    >>> l, d = ldl(np.array([[4.0, 2.0], [2.0, -3.0]]))
+    >>> l
+    array([[1. , 0. ],
+           [0.5, 1. ]])
+    >>> d
+    array([ 4., -4.])
+
+    """
+    l = _factor_symmetric(a, overwrite_a, block_size, cholesky=False)
+    d = l.diagonal().copy()
+    np.fill_diagonal(l, 1.0)
+
+    return l, d
+
+
+def cholesky_solve(l, b):
+    """Solve linear equations using a precomputed Cholesky factorization.
+
+    Parameters
+    ----------
+    l : numpy.ndarray
+        Lower triangular matrix as returned by :func:`cholesky`.
+    b : numpy.ndarray
+        Vector of length :math:`n` or matrix of dimension :math:`n \\times k`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations with the same shape as :math:`b`.
+
+    """
+    x = forward_substitution(l, b, check="none")
+    backward_substitution(l.T, x, out=x, check="none")
+
+    return x
+
+
+def ldl_solve(factorization, b):
+    """Solve linear equations using a precomputed LDL factorization.
+
+    Parameters
+    ----------
+    factorization : tuple
+        Tuple ``(l, d)`` as returned by :func:`ldl`.
+    b : numpy.ndarray
+        Vector of length :math:`n` or matrix of dimension :math:`n \\times k`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations with the same shape as :math:`b`.
+
+    """
+    l, d = factorization
+
+    x = forward_substitution(l, b, unit_diagonal=True, check="none")
+    x /= d.reshape((-1,) + (1,) * (x.ndim - 1))
+    backward_substitution(l.T, x, out=x, unit_diagonal=True, check="none")
+
+    return x
+
+
+class LUFactorization:
+    """LU factorization of a matrix that can be reused for many right-hand sides.
+
+    The factorization is computed once by :func:`lu_factor` at construction. Each subsequent
+    call to :meth:`solve` only requires a forward and a backward substitution, which reduces the
+    cost per right-hand side from :math:`O(n^3)` to :math:`O(n^2)`.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Nonsingular square matrix of dimension :math:`n \\times n`.
+    overwrite_a : bool
+        Whether to overwrite :math:`A` with its factorization.
+
+    Attributes
+    ----------
+    lu : numpy.ndarray
+        Compact storage of :math:`L` and :math:`U`, see :func:`lu_factor`.
+    piv : numpy.ndarray
+        Permutation vector such that ``a[piv]`` equals :math:`LU`.
+
+    Example
+    -------
+    >>> a = np.array([[3.0, 1.0], [1.0, 2.0]])
+    >>> factorization = LUFactorization(a)
+    >>> factorization.solve(np.array([9.0, 8.0]))
+    array([2., 3.])
+    >>> factorization.solve(np.array([[4.0, 1.0], [3.0, 2.0]]))
+    array([[1., 0.],
+           [1., 1.]])
+
+    """
+
+    def __init__(self, a, overwrite_a=False):
+        """Compute the factorization."""
+        self.lu, self.piv = lu_factor(a, overwrite_a=overwrite_a)
+
+    @property
+    def n(self):
+        """Dimension of the factorized matrix."""
+        return self.lu.shape[0]
+
+    @property
+    def lower(self):
+        """Unit lower triangular matrix :math:`L`."""
+        return np.tril(self.lu, -1) + np.eye(self.n)
+
+    @property
+    def upper(self):
+        """Upper triangular matrix :math:`U`."""
+        return np.triu(self.lu)
+
+    def solve(self, b):
+        """Solve the linear equations for one or several right-hand sides.
+
+        Parameters
+        ----------
+        b : numpy.ndarray
+            Vector of length :math:`n` or matrix of dimension :math:`n \\times k` whose
+            columns are right-hand sides.
+
+        Returns
+        -------
+        x : numpy.ndarray
+            Solution of the linear equations with the same shape as :math:`b`.
+
+        """
+        return lu_solve((self.lu, self.piv), b)
+
+    def solve_iter(self, vectors):
+        """Solve the linear equations for a stream of right-hand sides.
+
+        Parameters
+        ----------
+        vectors : iterable
+            Iterable of vectors of length :math:`n`.
+
+        Yields
+        ------
+        x : numpy.ndarray
+            Solution for each right-hand side in turn.
+
+        """
+        for b in vectors:
+            yield self.solve(b)
+
+
+def solve_batched(a, b):
+    """Solve a stack of independent linear equations using L-U factorization.
+
+    Solves the linear equations :math:`A_i x_i = b_i` for :math:`i = 1, \\dots, m` at once.
+    The factorization and the substitutions loop over the rows and columns of a single system
+    while all systems in the stack are processed together by vectorized operations over the
+    leading axis. This is much faster than calling :func:`solve` for each system if the number
+    of systems is large and their dimension is small.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Stack of matrices of dimension :math:`m \\times n \\times n`.
+    b : numpy.ndarray
+        Stack of vectors of dimension :math:`m \\times n` or stack of matrices of dimension
+        :math:`m \\times n \\times k`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solutions with the same shape as :math:`b`. The solutions of singular systems are set
+        to NaN.
+    singular : numpy.ndarray
+        Boolean vector of length :math:`m` indicating the singular systems.
+
+    Example
+    -------
+    >>> a = np.array([[[2.0, 0.0], [0.0, 4.0]], [[1.0, 1.0], [1.0, 1.0]]])
+    >>> b = np.array([[2.0, 2.0], [1.0, 1.0]])
+    >>> x, singular = solve_batched(a, b)
+    >>> x
+    array([[1. , 0.5],
+           [nan, nan]])
+    >>> singular
+    array([False,  True])
+
+    """
+    factorization = lu_factor_batched(a)
+    x = lu_solve_batched(factorization, b)
+
+    return x, factorization[2]
+
+
+def lu_factor_batched(a):
+    """Compute the LU factorizations of a stack of matrices using partial pivoting.
+
+    This is the batched version of :func:`lu_factor`. Singular matrices do not raise an error
+    but are reported in a vector of flags.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        Stack of matrices of dimension :math:`m \\times n \\times n`.
+
+    Returns
+    -------
+    lu : numpy.ndarray
+        Compact storage of the factorizations of dimension :math:`m \\times n \\times n`.
+    piv : numpy.ndarray
+        Permutation vectors of dimension :math:`m \\times n` such that ``a[i][piv[i]]``
+        equals :math:`L_i U_i`.
+    singular : numpy.ndarray
+        Boolean vector of length :math:`m` indicating the singular matrices.
+
+    """
+    lu = np.array(a, dtype=np.double)
+    m, n, _ = lu.shape
+
+    systems = np.arange(m)
+    piv = np.tile(np.arange(n), (m, 1))
+    singular = np.zeros(m, dtype=bool)
+
+    for k in range(n):
+        # Interchange row k with the pivot row of each system.
+        p = k + np.argmax(np.abs(lu[:, k:, k]), axis=1)
+        lu[systems, k], lu[systems, p] = lu[systems, p], lu[systems, k].copy()
+        piv[systems, k], piv[systems, p] = piv[systems, p], piv[systems, k]
+
+        # Record singular systems and keep their elimination finite.
+        pivot = lu[:, k, k]
+        singular |= pivot == 0
+        pivot = np.where(pivot == 0, 1.0, pivot)
+
+        lu[:, k + 1 :, k] /= pivot[:, None]
+        lu[:, k + 1 :, k + 1 :] -= lu[:, k + 1 :, k, None] * lu[:, None, k, k + 1 :]
+
+    return lu, piv, singular
+
+
+def lu_solve_batched(factorization, b):
+    """Solve a stack of linear equations using precomputed LU factorizations.
+
+    Parameters
+    ----------
+    factorization : tuple
+        Tuple ``(lu, piv, singular)`` as returned by :func:`lu_factor_batched`.
+    b : numpy.ndarray
+        Stack of vectors of dimension :math:`m \\times n` or stack of matrices of dimension
+        :math:`m \\times n \\times k`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solutions with the same shape as :math:`b`. The solutions of singular systems are set
+        to NaN.
+
+    """
+    lu, piv, singular = factorization
+    b = np.asarray(b, dtype=np.double)
+
+    # Work with a stack of matrices throughout, a single right-hand side is one column.
+    x = np.take_along_axis(b.reshape(b.shape[:2] + (-1,)), piv[:, :, None], axis=1)
+
+    for i in range(1, lu.shape[1]):
+        x[:, i] -= np.einsum("mj,mjk->mk", lu[:, i, :i], x[:, :i])
+
+    diagonal = np.where(singular[:, None], 1.0, np.diagonal(lu, axis1=1, axis2=2))
+    for i in range(lu.shape[1] - 1, -1, -1):
+        x[:, i] -= np.einsum("mj,mjk->mk", lu[:, i, i + 1 :], x[:, i + 1 :])
+        x[:, i] /= diagonal[:, i, None]
+
+    x[singular] = np.nan
+
+    return x.reshape(b.shape)
+
+
+def solve_tridiagonal(lower, diagonal, upper, b):
+    """Solve tridiagonal linear equations using the Thomas algorithm.
+
+    The Thomas algorithm is Gaussian elimination without pivoting specialized to tridiagonal
+    matrices. It requires :math:`O(n)` operations and memory, but is only stable if :math:`A` is,
+    for example, diagonally dominant or symmetric positive definite. Leading dimensions of the
+    arguments refer to independent systems with the same band structure, which are solved at
+    once.
+
+    Parameters
+    ----------
+    lower : numpy.ndarray
+        Subdiagonal :math:`a_{i+1, i}`, array of dimension :math:`\\dots \\times (n - 1)`.
+    diagonal : numpy.ndarray
+        Diagonal :math:`a_{ii}`, array of dimension :math:`\\dots \\times n`.
+    upper : numpy.ndarray
+        Superdiagonal :math:`a_{i, i+1}`, array of dimension :math:`\\dots \\times (n - 1)`.
+    b : numpy.ndarray
+        Right-hand sides, array of dimension :math:`\\dots \\times n`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solutions of the linear equations, array of dimension :math:`\\dots \\times n`.
+
+    Example
+    -------
+    >>> lower, upper = np.array([-1.0, -1.0]), np.array([-1.0, -1.0])
+    >>> solve_tridiagonal(lower, np.array([2.0, 2.0, 2.0]), upper, np.array([1.0, 0.0, 1.0]))
+    array([1., 1., 1.])
+
+    """
+    lower, diagonal, upper, b = (
+        np.asarray(arg, dtype=np.double) for arg in (lower, diagonal, upper, b)
+    )
+    n = diagonal.shape[-1]
+
+    shape = np.broadcast_shapes(
+        lower.shape[:-1], diagonal.shape[:-1], upper.shape[:-1], b.shape[:-1]
+    )
+    factors = np.zeros(shape + (n - 1,))
+    x = np.zeros(shape + (n,))
+
+    # Forward sweep eliminates the subdiagonal and scales the diagonal to one.
+    x[..., 0] = b[..., 0] / diagonal[..., 0]
+    factors[..., :1] = upper[..., :1] / diagonal[..., :1]
+    for i in range(1, n):
+        denominator = diagonal[..., i] - lower[..., i - 1] * factors[..., i - 1]
+        x[..., i] = (b[..., i] - lower[..., i - 1] * x[..., i - 1]) / denominator
+        if i < n - 1:
+            factors[..., i] = upper[..., i] / denominator
+
+    # Backward substitution with the unit upper bidiagonal matrix.
+    for i in range(n - 2, -1, -1):
+        x[..., i] -= factors[..., i] * x[..., i + 1]
+
+    return x
+
+
+def solve_banded(ab, bandwidths, b):
+    """Solve banded linear equations using L-U factorization.
+
+    Parameters
+    ----------
+    ab : numpy.ndarray
+        Banded matrix in diagonal ordered form, see :func:`lu_factor_banded`.
+    bandwidths : tuple
+        Number of nonzero subdiagonals :math:`l` and superdiagonals :math:`u`.
+    b : numpy.ndarray
+        Right-hand sides, array of dimension :math:`\\dots \\times n`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solutions of the linear equations, array of dimension :math:`\\dots \\times n`.
+
+    Example
+    -------
+    >>> ab = np.array([[0.0, 1.0, 1.0], [1.0, 1.0, 1.0], [2.0, 2.0, 0.0]])
+    >>> solve_banded(ab, (1, 1), np.array([2.0, 4.0, 3.0]))
+    array([1., 1., 1.])
+
+    """
+    return lu_solve_banded(lu_factor_banded(ab, bandwidths), b)
+
+
+def lu_factor_banded(ab, bandwidths):
+    """Compute the LU factorization of a banded matrix using partial pivoting.
+
+    A matrix with :math:`l` subdiagonals and :math:`u` superdiagonals is stored in diagonal
+    ordered form, where column :math:`j` of ``ab`` holds column :math:`j` of :math:`A` such that
+    ``ab[u + i - j, j] = a[i, j]``. The row interchanges of partial pivoting widen the upper band
+    of :math:`U` to at most :math:`l + u` superdiagonals. The factorization thus requires
+    :math:`O(n (l + u) l)` operations and :math:`O(n (2l + u))` memory. Leading dimensions of
+    ``ab`` refer to independent matrices with the same band structure, which are factorized at
+    once.
+
+    Parameters
+    ----------
+    ab : numpy.ndarray
+        Banded matrix in diagonal ordered form, array of dimension
+        :math:`\\dots \\times (l + u + 1) \\times n`.
+    bandwidths : tuple
+        Number of nonzero subdiagonals :math:`l` and superdiagonals :math:`u`.
+
+    Returns
+    -------
+    factorization : tuple
+        Tuple ``(lub, piv, bandwidths)``. The array ``lub`` holds :math:`U` in diagonal ordered
+        form with :math:`l + u` superdiagonals and the multipliers of :math:`L` below. The array
+        ``piv`` records that row :math:`k` was interchanged with row ``piv[..., k]`` in step
+        :math:`k`.
+
+    Raises
+    ------
+    numpy.linalg.LinAlgError
+        If any of the matrices is singular.
+
+    """
+    l, u = bandwidths
+    ab = np.asarray(ab, dtype=np.double)
+    n = ab.shape[-1]
+    batch_shape = ab.shape[:-2]
+
+    # Working storage with l additional superdiagonals to receive the fill-in.
+    lub = np.zeros((int(np.prod(batch_shape)), 2 * l + u + 1, n))
+    lub[:, l:] = ab.reshape((-1, l + u + 1, n))
+
+    systems = np.arange(lub.shape[0])
+    piv = np.zeros(lub.shape[::2], dtype=int)
+    a = _get_dense_view(lub, l + u)
+
+    for k in range(n):
+        # The window contains row k and the rows below it within the band.
+        window = a[:, k : k + l + 1, k : k + l + u + 1]
+
+        # Interchange row k with the pivot row of each matrix.
+        p = np.argmax(np.abs(window[:, :, 0]), axis=1)
+        piv[:, k] = k + p
+        if p.any():
+            window[:, 0], window[systems, p] = window[systems, p], window[:, 0].copy()
+
+        if (window[:, 0, 0] == 0).any():
+            raise np.linalg.LinAlgError("Singular matrix")
+
+        # Compute the multipliers and update the rows below.
+        window[:, 1:, 0] /= window[:, 0, 0, None]
+        window[:, 1:, 1:] -= window[:, 1:, 0, None] * window[:, None, 0, 1:]
+
+    return lub.reshape(batch_shape + lub.shape[1:]), piv.reshape(batch_shape + (n,)), bandwidths
+
+
+def lu_solve_banded(factorization, b):
+    """Solve banded linear equations using a precomputed LU factorization.
+
+    Parameters
+    ----------
+    factorization : tuple
+        Tuple ``(lub, piv, bandwidths)`` as returned by :func:`lu_factor_banded`.
+    b : numpy.ndarray
+        Right-hand sides, array of dimension :math:`\\dots \\times n`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solutions of the linear equations, array of dimension :math:`\\dots \\times n`.
+
+    """
+    lub, piv, (l, u) = factorization
+    n = lub.shape[-1]
+
+    shape = np.broadcast_shapes(lub.shape[:-2], np.shape(b)[:-1]) + (n,)
+    x = np.array(np.broadcast_to(b, shape), dtype=np.double).reshape((-1, n))
+    lub = np.broadcast_to(lub, shape[:-1] + lub.shape[-2:]).reshape((-1,) + lub.shape[-2:])
+    piv = np.broadcast_to(piv, shape).reshape((-1, n))
+
+    systems = np.arange(x.shape[0])
+    a = _get_dense_view(lub, l + u)
+
+    # Apply the interchanges and multipliers of L in the order of the elimination.
+    for k in range(n):
+        p = piv[:, k]
+        if (p != k).any():
+            x[systems, k], x[systems, p] = x[systems, p], x[systems, k]
+        x[:, k + 1 : k + l + 1] -= a[:, k + 1 : k + l + 1, k] * x[:, k, None]
+
+    # Backward substitution with U, which has l + u superdiagonals.
+    for i in range(n - 1, -1, -1):
+        x[:, i] -= np.einsum(
+            "mj,mj->m", a[:, i, i + 1 : i + l + u + 1], x[:, i + 1 : i + l + u + 1]
+        )
+        x[:, i] /= a[:, i, i]
+
+    return x.reshape(shape)
+
+
+def _estimate_condition(a, apply, apply_transposed, max_iterations=5):
+    """Estimate the condition number in the 1-norm given solvers for A and its transpose."""
+    n = a.shape[0]
+
+    x = np.full(n, 1 / n)
+    estimate, index = 0.0, None
+    for _ in range(max_iterations):
+        y = apply(x)
+        if np.abs(y).sum() <= estimate:
+            break
+        estimate = np.abs(y).sum()
+
+        z = apply_transposed(np.where(y >= 0, 1.0, -1.0))
+        index, previous = np.argmax(np.abs(z)), index
+        if np.abs(z[index]) <= z @ x or index == previous:
+            break
+
+        x = np.zeros(n)
+        x[index] = 1.0
+
+    # Safeguard against matrices for which the gradient method stalls.
+    x = np.linspace(1, 2, n) * (-1.0) ** np.arange(n)
+    estimate = max(estimate, 2 * np.abs(apply(x)).sum() / (3 * n))
+
+    return float(np.linalg.norm(a, 1) * estimate)
+
+
+def _adapt_relaxation(lambda_, ratio, strategy=SOR_STRATEGY_EXPONENT):
+    """Update the over-relaxation parameter given the convergence rate of SOR.
+
+    For a consistently ordered matrix, an eigenvalue :math:`\\mu` of the SOR iteration matrix
+    and an eigenvalue :math:`\\rho` of the Gauss-Jacobi iteration matrix satisfy
+    :math:`(\\mu + \\lambda - 1)^2 = \\lambda^2 \\rho^2 \\mu`. The observed convergence rate
+    estimates the dominant :math:`\\mu`, which yields the estimate of :math:`\\rho`.
+
+    At or beyond the optimal parameter, all eigenvalues :math:`\\mu` have modulus
+    :math:`\\lambda - 1`, so the observed rate carries no information on :math:`\\rho`. The
+    parameter is thus kept if the rate does not exceed :math:`(\\lambda - 1)^F` with the
+    strategy exponent :math:`F < 1`, which leaves a margin above :math:`\\lambda - 1`, or if
+    the iteration does not converge.
+
+    """
+    if ratio >= 1 or ratio <= max(lambda_ - 1, 0) ** strategy:
+        return lambda_
+
+    rho_squared = (ratio + lambda_ - 1) ** 2 / (lambda_ ** 2 * ratio)
+    if rho_squared >= 1:
+        return lambda_
+
+    return 2 / (1 + np.sqrt(1 - rho_squared))
+
+
+def _lower_relaxation(lambda_, rate, strategy=SOR_STRATEGY_EXPONENT):
+    """Lower an over-relaxation parameter that may exceed its optimum.
+
+    Beyond the optimal parameter, the average convergence rate equals :math:`\\lambda - 1`
+    and carries no information on how far :math:`\\lambda` exceeds the optimum. The distance
+    of :math:`\\lambda` to two is thus doubled, until a convergence rate clearly above
+    :math:`\\lambda - 1` shows that the parameter is below its optimum, from where
+    :func:`_adapt_relaxation` estimates the optimum. The same applies if the iteration stalls
+    or diverges.
+
+    """
+    if rate < 1 and rate > max(lambda_ - 1, 0) ** strategy:
+        return lambda_
+
+    return max(2 * lambda_ - 2, 1.0)
+
+
+def _factor_symmetric(a, overwrite_a, block_size, cholesky):
+    """Compute the Cholesky or LDL factorization in the lower triangle of ``a``."""
+    if overwrite_a:
+        c = np.asarray(a, dtype=np.double)
+    else:
+        c = np.array(a, dtype=np.double)
+
+    n = c.shape[0]
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+
+        # Factorize the current panel using rank-1 updates of its lower part.
+        for k in range(start, stop):
+            pivot = c[k, k]
+            if cholesky and not pivot > 0:
+                raise np.linalg.LinAlgError("Matrix is not positive definite")
+            elif pivot == 0:
+                raise np.linalg.LinAlgError("Zero pivot in LDL factorization")
+
+            column = c[k + 1 :, k].copy()
+            if cholesky:
+                c[k, k] = np.sqrt(pivot)
+                column /= c[k, k]
+                c[k + 1 :, k] = column
+            else:
+                c[k + 1 :, k] /= pivot
+
+            c[k + 1 :, k + 1 : stop] -= np.outer(c[k + 1 :, k], column[: stop - k - 1])
+
+        # Update the lower part of the trailing submatrix one block column at a time.
+        panel = c[stop:, start:stop]
+        if cholesky:
+            scaled = panel
+        else:
+            scaled = panel * c.diagonal()[start:stop]
+
+        for column in range(stop, n, block_size):
+            offset = column - stop
+            width = min(block_size, n - column)
+            c[column:, column : column + width] -= (
+                panel[offset:] @ scaled[offset : offset + width].T
+            )
+
+    # Clear the upper triangle, which holds intermediate results.
+    for i in range(n - 1):
+        c[i, i + 1 :] = 0.0
+
+    return c
+
+
+def _get_dense_view(lub, diagonal):
+    """Get a view of band storage that is indexed like a stack of dense matrices.
+
+    Element :math:`(i, j)` is stored at ``lub[:, diagonal + i - j, j]``, so that moving along a
+    row of the dense matrix corresponds to a fixed stride in the band storage. Only elements
+    within the band may be accessed through the view.
+
+    """
+    m, _, n = lub.shape
+    strides = (lub.strides[0], lub.strides[1], lub.strides[2] - lub.strides[1])
+
+    return as_strided(lub[:, diagonal], shape=(m, n, n), strides=strides, writeable=True)
+
+
+def _check_triangular(a, lower, check):
+    """Validate the triangular structure of ``a`` according to the requested mode."""
+    if check is None:
+        check = TRIANGULAR_CHECK
+
+    triangle = "lower" if lower else "upper"
+    msg = f"... function only intended for use with {triangle} triangular matrix"
+
+    if check == "full":
+        np.testing.assert_allclose(a, np.tril(a) if lower else np.triu(a), err_msg=msg)
+    elif check == "sampled":
+        n = a.shape[0]
+        for i in np.unique(np.linspace(0, n - 1, min(n, SAMPLED_CHECK_ROWS)).astype(int)):
+            outside = a[i, i + 1 :] if lower else a[i, :i]
+            if outside.any():
+                raise AssertionError(msg)
+    elif check != "none":
+        raise ValueError(f"Unknown check {check!r}, use 'full', 'sampled', or 'none'.")
+
+
+def _solve_lower(a, b, out=None, unit_diagonal=False):
+    """Solve with the lower triangle of ``a`` using row-wise dot products."""
+    x = _prepare_out(b, out)
+
+    # Here we perform the forward-substitution, the first row needs no dot product.
+    if not unit_diagonal:
+        x[0] /= a[0, 0]
+
+    # Looping over remaining rows.
+    for i in range(1, a.shape[0]):
+        x[i] -= a[i, :i] @ x[:i]
+        if not unit_diagonal:
+            x[i] /= a[i, i]
+
+    return x
+
+
+def _solve_upper(a, b, out=None, unit_diagonal=False):
+    """Solve with the upper triangle of ``a`` using row-wise dot products."""
+    x = _prepare_out(b, out)
+
+    for i in range(a.shape[0] - 1, -1, -1):
+        x[i] -= a[i, i + 1 :] @ x[i + 1 :]
+        if not unit_diagonal:
+            x[i] /= a[i, i]
+
+    return x
+
+
+def _prepare_out(b, out):
+    """Copy the right-hand side into the array that receives the solution."""
+    if out is None:
+        return np.array(b, dtype=np.double)
+
+    if out is not b:
+        out[...] = b
+
+    return out
@@ -1,11 +1,39 @@
 """This module contains some tests for our functions."""
+from itertools import product
+
 import numpy as np
 import pytest
+from scipy import sparse
+from scipy.linalg import hilbert
 
+from labs.linear_equations.linear_algorithms import LUFactorization
 from labs.linear_equations.linear_algorithms import backward_substitution
+from labs.linear_equations.linear_algorithms import cholesky
+from labs.linear_equations.linear_algorithms import estimate_condition
 from labs.linear_equations.linear_algorithms import forward_substitution
 from labs.linear_equations.linear_algorithms import gauss_seidel
+from labs.linear_equations.linear_algorithms import get_coloring
+from labs.linear_equations.linear_algorithms import ldl
+from labs.linear_equations.linear_algorithms import lu_factor
+from labs.linear_equations.linear_algorithms import lu_solve
+from labs.linear_equations.linear_algorithms import naive_lu
 from labs.linear_equations.linear_algorithms import solve
+from labs.linear_equations.linear_algorithms import solve_banded
+from labs.linear_equations.linear_algorithms import solve_batched
+from labs.linear_equations.linear_algorithms import solve_tridiagonal
+from labs.linear_equations.linear_krylov import bicgstab
+from labs.linear_equations.linear_krylov import conjugate_gradient
+from labs.linear_equations.linear_krylov import get_gauss_seidel_preconditioner
+from labs.linear_equations.linear_krylov import get_jacobi_preconditioner
+from labs.linear_equations.linear_krylov import gmres
+from labs.linear_equations.linear_multigrid import get_multigrid_hierarchy
+from labs.linear_equations.linear_multigrid import get_multigrid_preconditioner
+from labs.linear_equations.linear_multigrid import multigrid
+from labs.linear_equations.linear_out_of_core import lu_factor_out_of_core
+from labs.linear_equations.linear_out_of_core import lu_solve_out_of_core
+from labs.linear_equations.linear_problems import get_banded_problem
+from labs.linear_equations.linear_problems import get_dense_from_banded
+from labs.linear_equations.linear_problems import get_poisson_problem
 from labs.linear_equations.linear_problems import get_random_problem
 from labs.linear_equations.linear_solutions_tests import gauss_jacobi
 
@@ -50,3 +78,353 @@ def test_4():
 
     with pytest.raises(AssertionError):
         backward_substitution(a, b)
+
+
+@pytest.mark.repeat(5)
+def test_5():
+    """Check LU factorization with partial pivoting on general matrices."""
+    a, b, x_true = get_random_problem(n=50, is_diag=False)
+
+    lu, piv = lu_factor(a)
+    l, u = np.tril(lu, -1) + np.eye(50), np.triu(lu)
+    np.testing.assert_almost_equal(l @ u, a[piv])
+
+    l, u = naive_lu(a)
+    np.testing.assert_almost_equal(l @ u, a)
+
+    np.testing.assert_almost_equal(solve(a, b), x_true)
+
+
+def test_6():
+    """Check that small pivots are handled and singular matrices are detected."""
+    a, b = np.array([[1e-17, 1.0], [1.0, 1.0]]), np.array([1.0, 2.0])
+    np.testing.assert_almost_equal(solve(a, b), [1.0, 1.0])
+
+    with pytest.raises(np.linalg.LinAlgError):
+        lu_factor(np.ones((3, 3)))
+
+
+def test_7():
+    """Check that a factorization can be reused for many right-hand sides."""
+    a, _, _ = get_random_problem(n=20, is_diag=False)
+    x_true = np.random.uniform(size=(20, 4))
+    b = a @ x_true
+
+    factorization = LUFactorization(a)
+    np.testing.assert_almost_equal(factorization.solve(b), x_true)
+    np.testing.assert_almost_equal(factorization.lower @ factorization.upper, a[factorization.piv])
+
+    for x_solve, x in zip(factorization.solve_iter(b.T), x_true.T):
+        np.testing.assert_almost_equal(x_solve, x)
+
+
+def test_8():
+    """Check substitution kernels for several right-hand sides and output buffers."""
+    a, _, _ = get_random_problem(n=30, is_diag=False)
+    a += 30 * np.eye(30)
+    x_true = np.random.uniform(size=(30, 3))
+
+    for method, triangle in [(forward_substitution, np.tril), (backward_substitution, np.triu)]:
+        b = triangle(a) @ x_true
+        np.testing.assert_almost_equal(method(triangle(a), b), x_true)
+
+        out = np.empty_like(b)
+        x_solve = method(triangle(a), b, out=out)
+        assert x_solve is out
+        np.testing.assert_almost_equal(out, x_true)
+
+        method(triangle(a), b, out=b)
+        np.testing.assert_almost_equal(b, x_true)
+
+
+@pytest.mark.parametrize("check", ["full", "sampled"])
+def test_9(check):
+    """Check the validation modes of the substitution algorithms."""
+    a, b, _ = get_random_problem(n=10, is_diag=False)
+
+    for method in [forward_substitution, backward_substitution]:
+        with pytest.raises(AssertionError):
+            method(a, b, check=check)
+
+        method(a, b, check="none")
+
+    with pytest.raises(ValueError, match="Unknown check"):
+        forward_substitution(np.tril(a), b, check="some")
+
+
+@pytest.mark.repeat(5)
+def test_10():
+    """Check batched solver against numpy and the flags of singular systems."""
+    a = np.random.normal(size=(100, 5, 5))
+    a[3] = 1.0
+    x_true = np.random.uniform(size=(100, 5, 2))
+    b = a @ x_true
+
+    x_solve, singular = solve_batched(a, b)
+    np.testing.assert_equal(singular, np.arange(100) == 3)
+    assert np.isnan(x_solve[3]).all()
+    np.testing.assert_almost_equal(x_solve[~singular], x_true[~singular])
+
+    x_solve, _ = solve_batched(a, b[..., 0])
+    np.testing.assert_almost_equal(x_solve[~singular], x_true[~singular, :, 0])
+
+
+@pytest.mark.parametrize("lambda_", [1.0, 1.5])
+def test_11(lambda_):
+    """Check Gauss-Seidel and SOR on dense and sparse storage of a banded matrix."""
+    n = 50
+    a = sparse.diags([-1.0, 4.0, -1.0], [-1, 0, 1], shape=(n, n))
+    x_true = np.random.uniform(size=n)
+    b = a @ x_true
+
+    for matrix in [a, a.tocsr(), a.toarray()]:
+        x_solve = gauss_seidel(matrix, b, lambda_=lambda_)
+        np.testing.assert_almost_equal(x_solve, x_true)
+
+
+def test_12():
+    """Check Krylov subspace methods with and without preconditioning."""
+    a, b, x_true = get_poisson_problem(20, dimension=2)
+    preconditioners = [
+        None,
+        get_jacobi_preconditioner(a),
+        get_gauss_seidel_preconditioner(a, symmetric=True),
+    ]
+
+    for method, preconditioner in product([conjugate_gradient, bicgstab, gmres], preconditioners):
+        x_solve = method(a, b, tolerance=1e-12, preconditioner=preconditioner)
+        np.testing.assert_almost_equal(x_solve, x_true)
+
+    # Nonsymmetric problem with matrix-free product.
+    a = sparse.diags([-1.5, 4.0, -0.5], [-1, 0, 1], shape=(200, 200)).tocsr()
+    b = a @ x_true[:200]
+    for method in [bicgstab, gmres]:
+        x_solve = method(lambda v: a @ v, b, preconditioner=get_gauss_seidel_preconditioner(a))
+        np.testing.assert_almost_equal(x_solve, x_true[:200])
+
+    with pytest.raises(StopIteration):
+        conjugate_gradient(a, b, max_iterations=2)
+
+
+def test_13():
+    """Check mixed precision solves and the fallback for ill-conditioned problems."""
+    a, b, x_true = get_random_problem(n=100, is_diag=False)
+    a += 20 * np.eye(100)
+    b = a @ x_true
+
+    x_solve, info = solve(a, b, mixed_precision=True, return_info=True)
+    np.testing.assert_almost_equal(x_solve, x_true, decimal=12)
+    assert 0 < info["refinement_steps"] <= 10
+    assert not info["fallback"]
+
+    a = hilbert(8)
+    x_solve, info = solve(a, a @ x_true[:8], mixed_precision=True, return_info=True)
+    np.testing.assert_almost_equal(x_solve, solve(a, a @ x_true[:8]))
+    assert info["fallback"]
+
+
+@pytest.mark.parametrize("bandwidths", [(1, 1), (2, 3), (0, 2)])
+def test_14(bandwidths):
+    """Check banded solvers against the dense solver, with and without batches."""
+    ab, b, x_true = get_banded_problem(40, bandwidths, batch_shape=(3, 2))
+    np.testing.assert_almost_equal(solve_banded(ab, bandwidths, b), x_true)
+
+    a = get_dense_from_banded(ab[0, 0], bandwidths)
+    np.testing.assert_almost_equal(solve_banded(ab[0, 0], bandwidths, b[0, 0]), solve(a, b[0, 0]))
+
+    # Interchanges are required if the matrix is not diagonally dominant.
+    l, u = bandwidths
+    ab = np.random.normal(size=(l + u + 1, 40))
+    a = get_dense_from_banded(ab, bandwidths)
+    np.testing.assert_allclose(solve_banded(ab, bandwidths, b[0, 0]), solve(a, b[0, 0]))
+
+
+def test_15():
+    """Check the Thomas algorithm for tridiagonal matrices."""
+    ab, b, x_true = get_banded_problem(40, (1, 1), batch_shape=(5,))
+    lower, diagonal, upper = ab[:, 2, :-1], ab[:, 1], ab[:, 0, 1:]
+    np.testing.assert_almost_equal(solve_tridiagonal(lower, diagonal, upper, b), x_true)
+
+    # The same matrix for several right-hand sides.
+    x_solve = solve_tridiagonal(lower[0], diagonal[0], upper[0], b[0] + np.zeros((3, 1)))
+    np.testing.assert_almost_equal(x_solve, np.tile(x_true[0], (3, 1)))
+
+
+def test_16():
+    """Check Cholesky and LDL factorizations and the fallback to L-U factorization."""
+    m = np.random.normal(size=(80, 80))
+    a = m @ m.T + 80 * np.eye(80)
+    x_true = np.random.uniform(size=80)
+
+    l = cholesky(a, block_size=16)
+    np.testing.assert_almost_equal(l, np.linalg.cholesky(a))
+
+    l, d = ldl(a - 160 * np.eye(80), block_size=16)
+    np.testing.assert_almost_equal(l @ np.diag(d) @ l.T, a - 160 * np.eye(80))
+
+    for assume_a in ["pos", "sym"]:
+        x_solve, info = solve(a, a @ x_true, assume_a=assume_a, return_info=True)
+        np.testing.assert_almost_equal(x_solve, x_true)
+        assert not info["fallback"]
+
+    with pytest.raises(np.linalg.LinAlgError):
+        cholesky(-a)
+
+    x_solve, info = solve(-a, -a @ x_true, assume_a="pos", return_info=True)
+    np.testing.assert_almost_equal(x_solve, x_true)
+    assert info["fallback"]
+
+    # The LDL factorization does not pivot and fails on a zero diagonal element.
+    permutation = np.array([[0.0, 1.0], [1.0, 0.0]])
+    with pytest.raises(np.linalg.LinAlgError, match="Zero pivot"):
+        ldl(permutation)
+
+    x_solve, info = solve(permutation, np.array([1.0, 2.0]), assume_a="sym", return_info=True)
+    np.testing.assert_almost_equal(x_solve, [2.0, 1.0])
+    assert info["fallback"]
+
+
+@pytest.mark.repeat(5)
+def test_17():
+    """Check the condition number estimate and transposed solves."""
+    a, b, _ = get_random_problem(n=40, is_diag=False)
+    factorization = lu_factor(a)
+    np.testing.assert_almost_equal(lu_solve(factorization, b, trans=True), np.linalg.solve(a.T, b))
+
+    for matrix in [a, np.vander(1 + np.arange(8))]:
+        condition = np.linalg.cond(matrix, 1)
+        assert condition / 3 <= estimate_condition(matrix) <= condition * (1 + 1e-8)
+
+        _, info = solve(matrix, matrix @ np.ones(matrix.shape[0]), return_info=True)
+        np.testing.assert_allclose(info["condition"], estimate_condition(matrix))
+
+
+def test_18():
+    """Check the convergence history of the stationary iterative methods."""
+    a, b, x_true = get_poisson_problem(10)
+    a = a + sparse.identity(10)
+    b = a @ x_true
+
+    for method in [gauss_seidel, gauss_jacobi]:
+        result = method(a.toarray(), b, return_result=True)
+        assert result.converged
+        np.testing.assert_almost_equal(result.x, x_true)
+        assert result.residual_norms.shape == result.step_norms.shape == (result.iterations,)
+        assert result.step_norms[-1] < result.step_norms[0]
+
+        result = method(a.toarray(), b, max_iterations=3, return_result=True)
+        assert not result.converged
+        assert result.iterations == 3
+        np.testing.assert_almost_equal(
+            np.linalg.norm(b - a @ result.x), result.residual_norms.min()
+        )
+
+
+def test_19():
+    """Check the multicolor and block orderings of Gauss-Seidel against the natural one."""
+    a, b, x_true = get_poisson_problem(8, dimension=2)
+    a = a + sparse.identity(a.shape[0])
+    b = a @ x_true
+
+    colors = get_coloring(a)
+    assert colors.max() == 1
+    assert np.all(a[colors == 0][:, colors == 0].toarray() == np.diag(a.diagonal()[colors == 0]))
+
+    natural = gauss_seidel(a, b, lambda_=1.2, return_result=True)
+    for ordering, n_blocks in [("multicolor", None), ("block", 2), ("block", 4)]:
+        result = gauss_seidel(
+            a, b, lambda_=1.2, return_result=True, ordering=ordering, n_blocks=n_blocks
+        )
+        assert result.converged
+        np.testing.assert_almost_equal(result.x, x_true)
+        assert result.iterations <= 2 * natural.iterations
+
+    with pytest.raises(ValueError, match="Unknown ordering"):
+        gauss_seidel(a, b, ordering="diagonal")
+
+
+def test_20():
+    """Check that the adaptive over-relaxation finds the optimal parameter."""
+    n = 50
+    a, b, x_true = get_poisson_problem(n)
+    lambda_optimal = 2 / (1 + np.sin(np.pi / (n + 1)))
+
+    fixed = gauss_seidel(a, b, max_iterations=20000, tolerance=1e-10, return_result=True)
+    adaptive = gauss_seidel(
+        a, b, max_iterations=20000, tolerance=1e-10, return_result=True, adaptive=True
+    )
+    assert adaptive.converged
+    assert fixed.lambda_ == 1.0
+    np.testing.assert_almost_equal(adaptive.x, x_true)
+    np.testing.assert_allclose(adaptive.lambda_, lambda_optimal, rtol=1e-2)
+    assert 5 * adaptive.iterations < fixed.iterations
+
+    warm = gauss_seidel(
+        a, b, lambda_=adaptive.lambda_, tolerance=1e-10, return_result=True, adaptive=True
+    )
+    assert warm.iterations < adaptive.iterations
+
+    # A starting value above the optimum is lowered again.
+    above = gauss_seidel(a, b, lambda_=1.999, tolerance=1e-10, return_result=True, adaptive=True)
+    assert above.converged
+    np.testing.assert_allclose(above.lambda_, lambda_optimal, rtol=1e-2)
+    assert 5 * above.iterations < fixed.iterations
+
+    # The parameter of a larger problem exceeds the optimum of a smaller one.
+    a, b, x_true = get_poisson_problem(10)
+    kwargs = {"tolerance": 1e-10, "return_result": True, "adaptive": True}
+    cold = gauss_seidel(a, b, **kwargs)
+    warm = gauss_seidel(a, b, lambda_=adaptive.lambda_, **kwargs)
+    np.testing.assert_almost_equal(warm.x, x_true)
+    np.testing.assert_allclose(warm.lambda_, 2 / (1 + np.sin(np.pi / 11)), rtol=1e-2)
+    assert warm.iterations < 2 * cold.iterations
+
+
+def test_21():
+    """Check that the multigrid iteration counts do not grow with the size of the grid."""
+    iterations = []
+    for n in [16, 64]:
+        a, b, x_true = get_poisson_problem(n, dimension=2)
+        hierarchy = get_multigrid_hierarchy(a)
+        assert len(hierarchy) > 1
+
+        for cycle, smoother in product(["V", "W"], ["gauss_seidel", "jacobi"]):
+            x_solve = multigrid(
+                a, b, tolerance=1e-10, cycle=cycle, smoother=smoother, hierarchy=hierarchy
+            )
+            np.testing.assert_almost_equal(x_solve, x_true)
+
+        products = []
+
+        def matvec(v, a=a, products=products):
+            products.append(v)
+            return a @ v
+
+        preconditioner = get_multigrid_preconditioner(a, hierarchy=hierarchy)
+        x_solve = conjugate_gradient(matvec, b, tolerance=1e-10, preconditioner=preconditioner)
+        np.testing.assert_almost_equal(x_solve, x_true)
+        iterations.append(len(products))
+
+    assert iterations[1] <= iterations[0] + 3
+
+
+def test_22(tmp_path):
+    """Check the out-of-core LU factorization against the in-memory one."""
+    n = 50
+    a = np.memmap(tmp_path / "a.dat", dtype=np.double, mode="w+", shape=(n, n))
+    a[:] = np.random.normal(size=(n, n))
+    b = np.random.normal(size=(n, 3))
+
+    for panels in [1, 4, 7, n]:
+        budget = 4 * n * a.itemsize * (n // panels)
+        lu, piv = lu_factor_out_of_core(a, budget, filename=tmp_path / f"lu_{panels}.dat")
+        np.testing.assert_almost_equal(a[piv], (np.tril(lu, -1) + np.eye(n)) @ np.triu(lu))
+
+        x_solve = lu_solve_out_of_core((lu, piv), b, budget)
+        np.testing.assert_almost_equal(x_solve, np.linalg.solve(a, b))
+
+    with pytest.raises(ValueError, match="memory budget"):
+        lu_factor_out_of_core(a, memory_budget=n)
+
+    with pytest.raises(np.linalg.LinAlgError):
+        lu_factor_out_of_core(np.ones((n, n)), filename=tmp_path / "singular.dat")
@@ -0,0 +1,355 @@
+"""This module contains the Krylov subspace methods for the linear equations lab.
+
+The materials follow Saad (2003, :cite:`saad2003iterative`) (Chapters 6, 7, and 9). All methods
+only access the matrix :math:`A` through matrix-vector products. They accept dense or sparse
+matrices as well as a callable that computes the product, so that :math:`A` never needs to be
+stored explicitly.
+
+"""
+import numpy as np
+
+from labs.linear_equations.linear_algorithms import backward_substitution
+from labs.linear_equations.linear_algorithms import eps
+from labs.linear_equations.linear_algorithms import sor_splitting
+from labs.linear_equations.linear_algorithms import sor_sweep
+
+
+def conjugate_gradient(a, b, x0=None, max_iterations=1000, tolerance=eps, preconditioner=None):
+    """Solves linear equation of type :math:`Ax = b` using the conjugate gradient method.
+
+    The conjugate gradient method requires :math:`A` to be symmetric positive definite. Each
+    iteration minimizes the :math:`A`-norm of the error over a Krylov subspace that grows by one
+    dimension per iteration, using a single matrix-vector product and a few vector updates.
+
+    Parameters
+    ----------
+    a : numpy.ndarray, scipy.sparse.spmatrix, or callable
+        Symmetric positive definite matrix of dimension :math:`n \\times n` or function that
+        returns the product :math:`Av` for a vector :math:`v`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x0 : numpy.ndarray, default None
+        Array of starting values. Set to zero if None.
+    max_iterations : int
+        Maximum number of iterations.
+    tolerance : float
+        Convergence tolerance for the residual norm relative to the norm of :math:`b`.
+    preconditioner : callable, default None
+        Function that returns an approximation to :math:`A^{-1}r` for a residual :math:`r`. It
+        must be symmetric positive definite, for example
+        ``get_gauss_seidel_preconditioner(a, symmetric=True)``.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations. Vector of length :math:`n`.
+
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
+
+    Example
+    -------
+    >>> a = np.array([[4.0, 1.0], [1.0, 3.0]])
+    >>> b = np.array([1.0, 2.0])
+    >>> np.allclose(conjugate_gradient(a, b), np.linalg.solve(a, b))
+    True
+
+    """
+    matvec, precondition, x, threshold = _setup(a, b, x0, tolerance, preconditioner)
+
+    r = b - matvec(x)
+    z = precondition(r)
+    p = z.copy()
+    rz = r @ z
+
+    for _ in range(max_iterations):
+        if np.linalg.norm(r) <= threshold:
+            return x
+
+        q = matvec(p)
+        alpha = rz / (p @ q)
+        x += alpha * p
+        r -= alpha * q
+
+        z = precondition(r)
+        rz, rz_old = r @ z, rz
+        p = z + (rz / rz_old) * p
+
+    if np.linalg.norm(r) <= threshold:
+        return x
+
+    raise StopIteration
+
+
+def bicgstab(a, b, x0=None, max_iterations=1000, tolerance=eps, preconditioner=None):
+    """Solves linear equation of type :math:`Ax = b` using the BiCGSTAB method.
+
+    The biconjugate gradient stabilized method applies to general nonsymmetric matrices. Each
+    iteration requires two matrix-vector products and two applications of the preconditioner,
+    which is applied from the right. The storage requirements do not grow with the number of
+    iterations.
+
+    Parameters
+    ----------
+    a : numpy.ndarray, scipy.sparse.spmatrix, or callable
+        Matrix of dimension :math:`n \\times n` or function that returns the product :math:`Av`
+        for a vector :math:`v`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x0 : numpy.ndarray, default None
+        Array of starting values. Set to zero if None.
+    max_iterations : int
+        Maximum number of iterations.
+    tolerance : float
+        Convergence tolerance for the residual norm relative to the norm of :math:`b`.
+    preconditioner : callable, default None
+        Function that returns an approximation to :math:`A^{-1}r` for a residual :math:`r`.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations. Vector of length :math:`n`.
+
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached or the method
+        breaks down.
+
+    Example
+    -------
+    >>> a = np.array([[4.0, 1.0], [-1.0, 3.0]])
+    >>> b = np.array([1.0, 2.0])
+    >>> np.allclose(bicgstab(a, b), np.linalg.solve(a, b))
+    True
+
+    """
+    matvec, precondition, x, threshold = _setup(a, b, x0, tolerance, preconditioner)
+
+    r = b - matvec(x)
+    r_shadow = r.copy()
+    p, v = np.zeros_like(r), np.zeros_like(r)
+    rho, alpha, omega = 1.0, 1.0, 1.0
+
+    for _ in range(max_iterations):
+        if np.linalg.norm(r) <= threshold:
+            return x
+
+        rho, rho_old = r_shadow @ r, rho
+        if rho == 0 or omega == 0:
+            break
+
+        p = r + (rho / rho_old) * (alpha / omega) * (p - omega * v)
+        p_hat = precondition(p)
+        v = matvec(p_hat)
+        alpha = rho / (r_shadow @ v)
+
+        s = r - alpha * v
+        x += alpha * p_hat
+        if np.linalg.norm(s) <= threshold:
+            return x
+
+        s_hat = precondition(s)
+        t = matvec(s_hat)
+        omega = (t @ s) / (t @ t)
+
+        x += omega * s_hat
+        r = s - omega * t
+
+    if np.linalg.norm(r) <= threshold:
+        return x
+
+    raise StopIteration
+
+
+def gmres(a, b, x0=None, max_iterations=1000, tolerance=eps, preconditioner=None, restart=30):
+    """Solves linear equation of type :math:`Ax = b` using the restarted GMRES method.
+
+    The generalized minimal residual method applies to general nonsymmetric matrices. Each
+    iteration extends an orthonormal basis of the Krylov subspace by one vector (Arnoldi
+    process) and the residual norm is minimized over this subspace. Since the basis grows with
+    each iteration, the method is restarted from the current iterate after ``restart``
+    iterations. The preconditioner is applied from the right.
+
+    Parameters
+    ----------
+    a : numpy.ndarray, scipy.sparse.spmatrix, or callable
+        Matrix of dimension :math:`n \\times n` or function that returns the product :math:`Av`
+        for a vector :math:`v`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x0 : numpy.ndarray, default None
+        Array of starting values. Set to zero if None.
+    max_iterations : int
+        Maximum number of iterations, counted as matrix-vector products.
+    tolerance : float
+        Convergence tolerance for the residual norm relative to the norm of :math:`b`.
+    preconditioner : callable, default None
+        Function that returns an approximation to :math:`A^{-1}r` for a residual :math:`r`.
+    restart : int
+        Number of iterations between restarts.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations. Vector of length :math:`n`.
+
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
+
+    Example
+    -------
+    >>> a = np.array([[4.0, 1.0], [-1.0, 3.0]])
+    >>> b = np.array([1.0, 2.0])
+    >>> np.allclose(gmres(a, b), np.linalg.solve(a, b))
+    True
+
+    """
+    matvec, precondition, x, threshold = _setup(a, b, x0, tolerance, preconditioner)
+
+    iteration = 0
+    while True:
+        r = b - matvec(x)
+        beta = np.linalg.norm(r)
+        if beta <= threshold:
+            return x
+
+        if iteration >= max_iterations:
+            raise StopIteration
+
+        # Orthonormal basis of the Krylov subspace and the Hessenberg matrix, which is reduced
+        # to upper triangular form by Givens rotations as the iteration proceeds.
+        basis = np.zeros((restart + 1, r.shape[0]))
+        hessenberg = np.zeros((restart + 1, restart))
+        cosines, sines = np.zeros(restart), np.zeros(restart)
+        g = np.zeros(restart + 1)
+
+        basis[0] = r / beta
+        g[0] = beta
+
+        for j in range(restart):
+            iteration += 1
+            w = matvec(precondition(basis[j]))
+
+            # Arnoldi process using classical Gram-Schmidt with reorthogonalization.
+            h = basis[: j + 1] @ w
+            w -= basis[: j + 1].T @ h
+            correction = basis[: j + 1] @ w
+            w -= basis[: j + 1].T @ correction
+            h += correction
+
+            hessenberg[: j + 1, j] = h
+            hessenberg[j + 1, j] = np.linalg.norm(w)
+            if hessenberg[j + 1, j] != 0:
+                basis[j + 1] = w / hessenberg[j + 1, j]
+
+            # Apply previous rotations to the new column and eliminate its subdiagonal element.
+            for i in range(j):
+                upper, lower = hessenberg[i, j], hessenberg[i + 1, j]
+                hessenberg[i, j] = cosines[i] * upper + sines[i] * lower
+                hessenberg[i + 1, j] = -sines[i] * upper + cosines[i] * lower
+
+            radius = np.hypot(hessenberg[j, j], hessenberg[j + 1, j])
+            cosines[j], sines[j] = hessenberg[j, j] / radius, hessenberg[j + 1, j] / radius
+            hessenberg[j, j], hessenberg[j + 1, j] = radius, 0.0
+            g[j + 1] = -sines[j] * g[j]
+            g[j] = cosines[j] * g[j]
+
+            if abs(g[j + 1]) <= threshold or iteration >= max_iterations:
+                break
+
+        k = j + 1
+        y = backward_substitution(hessenberg[:k, :k], g[:k], check="none")
+        x += precondition(basis[:k].T @ y)
+
+
+def get_jacobi_preconditioner(a):
+    """Get the Jacobi preconditioner of a matrix.
+
+    The preconditioner divides the residual by the diagonal of :math:`A`, which corresponds to
+    a single Gauss-Jacobi iteration started at zero.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+
+    Returns
+    -------
+    preconditioner : callable
+        Function that maps a residual to its preconditioned version.
+
+    """
+    diagonal = np.asarray(a.diagonal(), dtype=np.double)
+
+    def preconditioner(r):
+        return r / diagonal
+
+    return preconditioner
+
+
+def get_gauss_seidel_preconditioner(a, sweeps=1, lambda_=1.0, symmetric=False):
+    """Get a preconditioner based on Gauss-Seidel or SOR sweeps.
+
+    The preconditioner applies a fixed number of sweeps of :func:`sor_sweep` to the equation
+    :math:`Az = r`, starting at :math:`z = 0`. A symmetric preconditioner, as required by
+    :func:`conjugate_gradient`, follows each forward sweep by a reverse sweep (symmetric
+    Gauss-Seidel or SSOR).
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+    sweeps : int
+        Number of sweeps.
+    lambda_ : float
+        Over-relaxation parameter.
+    symmetric : bool
+        Whether to follow each forward sweep by a reverse sweep.
+
+    Returns
+    -------
+    preconditioner : callable
+        Function that maps a residual to its preconditioned version.
+
+    """
+    splitting = sor_splitting(a)
+
+    def preconditioner(r):
+        z = np.zeros_like(r, dtype=np.double)
+        for _ in range(sweeps):
+            sor_sweep(splitting, r, z, lambda_)
+            if symmetric:
+                sor_sweep(splitting, r, z, lambda_, reverse=True)
+
+        return z
+
+    return preconditioner
+
+
+def _setup(a, b, x0, tolerance, preconditioner):
+    """Prepare the matrix-vector product, preconditioner, starting values, and threshold."""
+    if callable(a):
+        matvec = a
+    else:
+
+        def matvec(v):
+            return a @ v
+
+    if preconditioner is None:
+
+        def preconditioner(r):
+            return r
+
+    if x0 is None:
+        x = np.zeros_like(b, dtype=np.double)
+    else:
+        x = np.array(x0, dtype=np.double)
+
+    threshold = tolerance * np.linalg.norm(b)
+
+    return matvec, preconditioner, x, threshold
@@ -0,0 +1,320 @@
+"""This module contains the multigrid methods for the linear equations lab.
+
+The materials follow Saad (2003, :cite:`saad2003iterative`) (Chapter 13) and Vanek, Mandel, and
+Brezina (1996, :cite:`vanek1996algebraic`). Stationary methods such as :func:`gauss_seidel`
+quickly remove the oscillatory components of the error but need many iterations for its smooth
+components. Multigrid methods instead correct the smooth components on a coarser level, where
+they can be removed cheaply, so that the number of iterations does not grow with the size of the
+problem. The coarse levels are built algebraically from the matrix alone, so no grid is needed.
+
+"""
+import numpy as np
+from scipy import sparse
+
+from labs.linear_equations.linear_algorithms import LUFactorization
+from labs.linear_equations.linear_algorithms import eps
+from labs.linear_equations.linear_algorithms import sor_splitting
+from labs.linear_equations.linear_algorithms import sor_sweep
+
+
+def multigrid(
+    a,
+    b,
+    x0=None,
+    max_iterations=100,
+    tolerance=eps,
+    cycle="V",
+    smoother="gauss_seidel",
+    sweeps=1,
+    hierarchy=None,
+):
+    """Solves linear equation of type :math:`Ax = b` using multigrid cycles.
+
+    Each iteration performs a single cycle of :func:`multigrid_cycle` on the hierarchy of
+    coarse levels built by :func:`get_multigrid_hierarchy`.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+    b : numpy.ndarray
+        Vector of length :math:`n`.
+    x0 : numpy.ndarray, default None
+        Array of starting values. Set to zero if None.
+    max_iterations : int
+        Maximum number of cycles.
+    tolerance : float
+        Convergence tolerance for the residual norm relative to the norm of :math:`b`.
+    cycle : str
+        Type of the cycle, either "V" or "W".
+    smoother : str
+        Smoother on each level, either "gauss_seidel" or "jacobi".
+    sweeps : int
+        Number of smoothing sweeps before and after the coarse level correction.
+    hierarchy : list, default None
+        Hierarchy of levels as returned by :func:`get_multigrid_hierarchy`, which can be reused
+        across solves with the same matrix. Built from :math:`A` if None.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations. Vector of length :math:`n`.
+
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
+
+    Example
+    -------
+    >>> from labs.linear_equations.linear_problems import get_poisson_problem
+    >>> a, b, x = get_poisson_problem(100)
+    >>> np.allclose(multigrid(a, b, tolerance=1e-12), x)
+    True
+
+    """
+    if hierarchy is None:
+        hierarchy = get_multigrid_hierarchy(a)
+
+    if x0 is None:
+        x = np.zeros_like(b, dtype=np.double)
+    else:
+        x = np.array(x0, dtype=np.double)
+
+    threshold = tolerance * np.linalg.norm(b)
+    for _ in range(max_iterations):
+        if np.linalg.norm(b - hierarchy[0]["a"] @ x) <= threshold:
+            return x
+
+        multigrid_cycle(hierarchy, b, x, cycle, smoother, sweeps)
+
+    if np.linalg.norm(b - hierarchy[0]["a"] @ x) <= threshold:
+        return x
+
+    raise StopIteration
+
+
+def multigrid_cycle(hierarchy, b, x, cycle="V", smoother="gauss_seidel", sweeps=1, level=0):
+    """Perform a single multigrid cycle in place.
+
+    The cycle smooths the error on the current level, restricts the residual to the next coarser
+    level, solves for the correction there recursively, interpolates the correction back, and
+    smooths again. The recursion visits each coarse level once (V-cycle) or twice (W-cycle) and
+    ends on the coarsest level with a direct solve. Gauss-Seidel smoothing sweeps forward before
+    and backward after the correction, so that the cycle is symmetric for symmetric matrices.
+
+    Parameters
+    ----------
+    hierarchy : list
+        Hierarchy of levels as returned by :func:`get_multigrid_hierarchy`.
+    b : numpy.ndarray
+        Right-hand side on the current level.
+    x : numpy.ndarray
+        Current iterate of type double, updated in place.
+    cycle : str
+        Type of the cycle, either "V" or "W".
+    smoother : str
+        Smoother on each level, either "gauss_seidel" or "jacobi".
+    sweeps : int
+        Number of smoothing sweeps before and after the coarse level correction.
+    level : int
+        Index of the current level in the hierarchy.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Updated iterate.
+
+    """
+    if cycle not in ["V", "W"]:
+        raise ValueError(f"Unknown cycle: {cycle}.")
+
+    current = hierarchy[level]
+    if level == len(hierarchy) - 1:
+        x[...] = current["factorization"].solve(b)
+        return x
+
+    for _ in range(sweeps):
+        _smooth(current, b, x, smoother, reverse=False)
+
+    prolongation = current["prolongation"]
+    coarse_b = prolongation.T @ (b - current["a"] @ x)
+    coarse_x = np.zeros_like(coarse_b)
+    for _ in range(1 if cycle == "V" else 2):
+        multigrid_cycle(hierarchy, coarse_b, coarse_x, cycle, smoother, sweeps, level + 1)
+    x += prolongation @ coarse_x
+
+    for _ in range(sweeps):
+        _smooth(current, b, x, smoother, reverse=True)
+
+    return x
+
+
+def get_multigrid_hierarchy(a, max_levels=10, coarse_size=64, strength=0.08):
+    """Build the levels of an algebraic multigrid method by smoothed aggregation.
+
+    On each level, the unknowns are grouped into aggregates of strongly coupled unknowns by
+    :func:`get_aggregates`. The tentative prolongation interpolates a constant over each
+    aggregate and is smoothed by a damped Jacobi step,
+    :math:`P = (I - \\frac{4}{3 \\rho} D^{-1} A) P_0`, where :math:`\\rho` is the Gershgorin bound
+    on the spectral radius of :math:`D^{-1} A`. The coarse matrix is the Galerkin product
+    :math:`P^T A P`. The coarsening stops once a level has at most `coarse_size` unknowns,
+    which is then factorized for a direct solve.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+    max_levels : int
+        Maximum number of levels.
+    coarse_size : int
+        Maximum number of unknowns on the coarsest level.
+    strength : float
+        Threshold for strong coupling, see :func:`get_aggregates`.
+
+    Returns
+    -------
+    hierarchy : list
+        List of dictionaries, one per level from fine to coarse. Each contains the matrix
+        ``"a"`` in CSR format, its ``"diagonal"`` and ``"splitting"`` as returned by
+        :func:`sor_splitting`, and the ``"prolongation"`` to the next finer level. The coarsest
+        level instead contains the ``"factorization"`` of its matrix.
+
+    """
+    a = sparse.csr_matrix(a, dtype=np.double)
+
+    hierarchy = []
+    while len(hierarchy) < max_levels - 1 and a.shape[0] > coarse_size:
+        aggregates = get_aggregates(a, strength)
+        n_aggregates = aggregates.max() + 1
+        if n_aggregates == a.shape[0]:
+            break
+
+        tentative = sparse.csr_matrix(
+            (np.ones(a.shape[0]), (np.arange(a.shape[0]), aggregates)),
+            shape=(a.shape[0], n_aggregates),
+        )
+        tentative = tentative @ sparse.diags(1 / np.sqrt(tentative.sum(axis=0).A1))
+
+        diagonal = a.diagonal()
+        scaled = sparse.diags(1 / diagonal) @ a
+        rho = abs(scaled).sum(axis=1).max()
+        prolongation = (tentative - (4 / (3 * rho)) * (scaled @ tentative)).tocsr()
+
+        hierarchy.append(
+            {
+                "a": a,
+                "diagonal": diagonal,
+                "splitting": sor_splitting(a),
+                "prolongation": prolongation,
+            }
+        )
+        a = (prolongation.T @ a @ prolongation).tocsr()
+
+    hierarchy.append({"a": a, "factorization": LUFactorization(a.toarray())})
+
+    return hierarchy
+
+
+def get_aggregates(a, strength=0.08):
+    """Group the unknowns into aggregates of strongly coupled unknowns.
+
+    Unknown :math:`j` is strongly coupled to unknown :math:`i` if
+    :math:`|a_{ij}| \\geq \\theta \\sqrt{|a_{ii} a_{jj}|}`. The aggregation proceeds in three
+    passes. The first pass forms an aggregate from each unknown whose strongly coupled unknowns
+    are not aggregated yet, together with these unknowns. The second pass adds each remaining
+    unknown to an aggregate of a strongly coupled unknown. The third pass forms aggregates from
+    the unknowns that are still left.
+
+    Parameters
+    ----------
+    a : scipy.sparse.csr_matrix
+        Matrix of dimension :math:`n \\times n`.
+    strength : float
+        Threshold :math:`\\theta` for strong coupling.
+
+    Returns
+    -------
+    aggregates : numpy.ndarray
+        Aggregate of each unknown, numbered from zero. Vector of length :math:`n`.
+
+    """
+    coo = a.tocoo()
+    diagonal = np.abs(a.diagonal())
+    is_strong = (coo.row != coo.col) & (
+        np.abs(coo.data) >= strength * np.sqrt(diagonal[coo.row] * diagonal[coo.col])
+    )
+    graph = sparse.csr_matrix(
+        (np.ones(is_strong.sum()), (coo.row[is_strong], coo.col[is_strong])), shape=a.shape
+    )
+    indptr, indices = graph.indptr, graph.indices
+
+    aggregates = np.full(a.shape[0], -1)
+    n_aggregates = 0
+    for i in range(a.shape[0]):
+        neighbors = indices[indptr[i] : indptr[i + 1]]
+        if aggregates[i] == -1 and np.all(aggregates[neighbors] == -1):
+            aggregates[i] = aggregates[neighbors] = n_aggregates
+            n_aggregates += 1
+
+    first_pass = aggregates.copy()
+    for i in np.flatnonzero(aggregates == -1):
+        neighbors = indices[indptr[i] : indptr[i + 1]]
+        candidates = first_pass[neighbors][first_pass[neighbors] != -1]
+        if candidates.size > 0:
+            aggregates[i] = candidates[0]
+
+    for i in np.flatnonzero(aggregates == -1):
+        neighbors = indices[indptr[i] : indptr[i + 1]]
+        aggregates[i] = n_aggregates
+        aggregates[neighbors[aggregates[neighbors] == -1]] = n_aggregates
+        n_aggregates += 1
+
+    return aggregates
+
+
+def get_multigrid_preconditioner(a, cycle="V", smoother="gauss_seidel", sweeps=1, hierarchy=None):
+    """Get a preconditioner based on a multigrid cycle.
+
+    The preconditioner applies a single cycle of :func:`multigrid_cycle` to the equation
+    :math:`Az = r`, starting at :math:`z = 0`. It is symmetric for symmetric matrices and can
+    thus be used with :func:`conjugate_gradient` as well as the nonsymmetric Krylov methods.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or scipy.sparse.spmatrix
+        Matrix of dimension :math:`n \\times n`.
+    cycle : str
+        Type of the cycle, either "V" or "W".
+    smoother : str
+        Smoother on each level, either "gauss_seidel" or "jacobi".
+    sweeps : int
+        Number of smoothing sweeps before and after the coarse level correction.
+    hierarchy : list, default None
+        Hierarchy of levels as returned by :func:`get_multigrid_hierarchy`. Built from
+        :math:`A` if None.
+
+    Returns
+    -------
+    preconditioner : callable
+        Function that maps a residual to its preconditioned version.
+
+    """
+    if hierarchy is None:
+        hierarchy = get_multigrid_hierarchy(a)
+
+    def preconditioner(r):
+        z = np.zeros_like(r, dtype=np.double)
+        return multigrid_cycle(hierarchy, r, z, cycle, smoother, sweeps)
+
+    return preconditioner
+
+
+def _smooth(level, b, x, smoother, reverse):
+    """Apply a single smoothing sweep on a level in place."""
+    if smoother == "gauss_seidel":
+        sor_sweep(level["splitting"], b, x, reverse=reverse)
+    elif smoother == "jacobi":
+        x += (2 / 3) * (b - level["a"] @ x) / level["diagonal"]
+    else:
+        raise ValueError(f"Unknown smoother: {smoother}.")
@@ -0,0 +1,187 @@
+"""This module contains the out-of-core LU factorization for the linear equations lab.
+
+The factorization follows the left-looking variant in Golub and Van Loan (2013,
+:cite:`golub2013matrix`) (Chapter 3). The matrix and its factors are stored in a memory-mapped
+file on disk in column-major order, so that each panel of consecutive columns is a contiguous
+block of the file. Only a working set of two panels is held in memory at any time, whose size is
+set by a memory budget rather than by the dimension of the matrix.
+
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from labs.linear_equations.linear_algorithms import backward_substitution
+from labs.linear_equations.linear_algorithms import forward_substitution
+
+
+def lu_factor_out_of_core(a, memory_budget=2 ** 28, filename=None, dtype=np.double):
+    """Apply an out-of-core LU factorization with partial pivoting.
+
+    The matrix is processed in panels of consecutive columns. To factorize a panel, the
+    previously factorized panels are read back from disk one at a time and applied to it by
+    forward substitution with their diagonal tiles and a matrix product with the tiles below.
+    The panel is then factorized in memory, interchanging its rows, and written to disk. The
+    row interchanges also apply to the previously factorized panels. Rather than reading these
+    panels again, each interchange is applied the next time the panel is read and written back.
+    A final pass applies the interchanges of the last panel.
+
+    Parameters
+    ----------
+    a : numpy.ndarray or numpy.memmap
+        Matrix of dimension :math:`n \\times n`, which may itself be memory-mapped. It is not
+        modified.
+    memory_budget : int
+        Number of bytes available for the panels held in memory.
+    filename : str or pathlib.Path, default None
+        File that stores the factorization. A temporary file, which the caller removes once the
+        factorization is no longer needed, is created if None.
+    dtype : numpy.dtype
+        Type of the elements in the factorization.
+
+    Returns
+    -------
+    factorization : tuple
+        Tuple ``(lu, piv)`` in the same format as returned by :func:`lu_factor`, where ``lu``
+        is a :class:`numpy.memmap` in column-major order.
+
+    Raises
+    ------
+    ValueError
+        If the memory budget does not suffice to hold a single column.
+    numpy.linalg.LinAlgError
+        If the matrix is singular.
+
+    Example
+    -------
+    >>> import os
+    >>> a = np.array([[1.0, 2.0], [3.0, 4.0]])
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     lu, piv = lu_factor_out_of_core(a, filename=os.path.join(directory, "lu.dat"))
+    ...     np.allclose(a[piv], (np.tril(lu, -1) + np.eye(2)) @ np.triu(lu))
+    ...     del lu
+    True
+
+    """
+    n = a.shape[0]
+    width = _get_panel_width(n, memory_budget, np.dtype(dtype).itemsize)
+
+    if filename is None:
+        descriptor, filename = tempfile.mkstemp(suffix=".dat")
+        os.close(descriptor)
+    lu = np.memmap(filename, dtype=dtype, mode="w+", shape=(n, n), order="F")
+
+    starts = list(range(0, n, width))
+    for start in starts:
+        lu[:, start : start + width] = a[:, start : start + width]
+
+    piv = np.arange(n)
+    pending = None
+    for j, start in enumerate(starts):
+        stop = min(start + width, n)
+        panel = np.array(lu[:, start:stop])[piv]
+
+        # Apply the previous panels, catching up on the interchanges of the last panel.
+        for i, previous in enumerate(starts[:j]):
+            end = previous + width
+            factors = np.array(lu[:, previous:end])
+            if i < j - 1:
+                factors[pending[0] :] = factors[pending[0] :][pending[1]]
+                lu[:, previous:end] = factors
+
+            panel[previous:end] = forward_substitution(
+                factors[previous:end], panel[previous:end], unit_diagonal=True, check="none"
+            )
+            panel[end:] -= factors[end:] @ panel[previous:end]
+
+        permutation = _factor_panel(panel[start:])
+        piv[start:] = piv[start:][permutation]
+        pending = (start, permutation)
+
+        lu[:, start:stop] = panel
+
+    for previous in starts[:-1]:
+        end = previous + width
+        factors = np.array(lu[pending[0] :, previous:end])
+        lu[pending[0] :, previous:end] = factors[pending[1]]
+
+    lu.flush()
+
+    return lu, piv
+
+
+def lu_solve_out_of_core(factorization, b, memory_budget=2 ** 28):
+    """Solve linear equations using an out-of-core LU factorization.
+
+    The forward and backward substitutions read the factorization one panel at a time. Each
+    panel contributes a substitution with its diagonal tile and an update of the remaining
+    right-hand side with the tiles below or above.
+
+    Parameters
+    ----------
+    factorization : tuple
+        Tuple ``(lu, piv)`` as returned by :func:`lu_factor_out_of_core`.
+    b : numpy.ndarray
+        Vector of length :math:`n` or matrix of dimension :math:`n \\times k`.
+    memory_budget : int
+        Number of bytes available for the panel held in memory.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Solution of the linear equations with the same shape as :math:`b`.
+
+    """
+    lu, piv = factorization
+    n = lu.shape[0]
+    width = _get_panel_width(n, memory_budget, lu.dtype.itemsize)
+    starts = range(0, n, width)
+
+    x = np.array(b, dtype=np.result_type(lu.dtype, b.dtype))[piv]
+
+    for start in starts:
+        stop = start + width
+        factors = np.array(lu[start:, start:stop])
+        forward_substitution(
+            factors[: stop - start], x[start:stop], x[start:stop], unit_diagonal=True, check="none"
+        )
+        x[stop:] -= factors[stop - start :] @ x[start:stop]
+
+    for start in reversed(starts):
+        stop = start + width
+        factors = np.array(lu[:stop, start:stop])
+        backward_substitution(factors[start:], x[start:stop], x[start:stop], check="none")
+        x[:start] -= factors[:start] @ x[start:stop]
+
+    return x
+
+
+def _factor_panel(panel):
+    """Factorize a tall panel in place with partial pivoting and return its row permutation."""
+    permutation = np.arange(panel.shape[0])
+
+    for k in range(panel.shape[1]):
+        p = k + np.argmax(np.abs(panel[k:, k]))
+        if panel[p, k] == 0:
+            raise np.linalg.LinAlgError("Singular matrix")
+
+        if p != k:
+            panel[[k, p]] = panel[[p, k]]
+            permutation[[k, p]] = permutation[[p, k]]
+
+        panel[k + 1 :, k] /= panel[k, k]
+        panel[k + 1 :, k + 1 :] -= np.outer(panel[k + 1 :, k], panel[k, k + 1 :])
+
+    return permutation
+
+
+def _get_panel_width(n, memory_budget, itemsize):
+    """Get the number of columns per panel such that the working set fits the budget."""
+    # The working set consists of the current panel, a previous panel, and up to two temporaries
+    # of the same size for the row interchanges and the updates.
+    width = min(memory_budget // (4 * n * itemsize), n)
+    if width < 1:
+        raise ValueError("The memory budget does not suffice to hold a single column.")
+
+    return width
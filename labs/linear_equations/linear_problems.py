@@ -1,5 +1,6 @@
 """Exemplary problems for lab on linear equations."""
 import numpy as np
+from scipy import sparse
 
 
 def get_random_problem(n=2, is_diag=True):
@@ -29,3 +30,54 @@ def get_inverse_demand_problem():
     x = np.array([6.0, 4.0])
 
     return a, b, x
+
+
+def get_poisson_problem(n, dimension=1):
+    """Create discretized Poisson problem on a uniform grid with :math:`n` points per axis."""
+    second_difference = sparse.diags([-1.0, 2.0, -1.0], [-1, 0, 1], shape=(n, n))
+    a = second_difference
+    for _ in range(dimension - 1):
+        identity = sparse.identity(a.shape[0])
+        a = sparse.kron(a, sparse.identity(n)) + sparse.kron(identity, second_difference)
+
+    a = a.tocsr()
+    x = np.random.uniform(size=a.shape[0])
+    b = a @ x
+
+    return a, b, x
+
+
+def get_banded_problem(n, bandwidths=(1, 1), batch_shape=()):
+    """Create random diagonally dominant banded problem in diagonal ordered form."""
+    l, u = bandwidths
+    ab = np.random.normal(size=batch_shape + (l + u + 1, n))
+
+    # Zero the corners that lie outside the matrix and make the matrix diagonally dominant.
+    for offset in range(-l, u + 1):
+        if offset > 0:
+            ab[..., u - offset, :offset] = 0
+        elif offset < 0:
+            ab[..., u - offset, n + offset :] = 0
+    ab[..., u, :] = np.abs(ab).sum(axis=-2) + 1
+
+    # Compute the right-hand side diagonal by diagonal to avoid dense storage.
+    x = np.random.uniform(size=batch_shape + (n,))
+    b = np.zeros_like(x)
+    for offset in range(-l, u + 1):
+        rows = np.arange(max(0, -offset), min(n, n - offset))
+        b[..., rows] += ab[..., u - offset, rows + offset] * x[..., rows + offset]
+
+    return ab, b, x
+
+
+def get_dense_from_banded(ab, bandwidths):
+    """Convert matrix from diagonal ordered form to dense storage."""
+    l, u = bandwidths
+    n = ab.shape[-1]
+
+    a = np.zeros(ab.shape[:-2] + (n, n))
+    for offset in range(-l, u + 1):
+        rows = np.arange(max(0, -offset), min(n, n - offset))
+        a[..., rows, rows + offset] = ab[..., u - offset, rows + offset]
+
+    return a
@@ -5,6 +5,7 @@ from itertools import product
 import matplotlib.pyplot as plt
 import numpy as np
 
+from labs.linear_equations.linear_algorithms import IterativeResult
 from labs.linear_equations.linear_algorithms import backward_substitution
 from labs.linear_equations.linear_algorithms import eps
 from labs.linear_equations.linear_problems import get_random_problem
@@ -85,7 +86,7 @@ def test_3():
     plot_ill_problem_2(cond, err, grid)
 
 
-def gauss_jacobi(a, b, x0=None, max_iterations=1000, tolerance=eps):
+def gauss_jacobi(a, b, x0=None, max_iterations=1000, tolerance=eps, return_result=False):
     """Solves linear equation of type :math:`Ax = b` using Gauss-Jacobi iterations.
 
     The algorithm follows the same solution method as the Gauss-Seidel method outlined in
@@ -105,29 +106,41 @@ def gauss_jacobi(a, b, x0=None, max_iterations=1000, tolerance=eps):
         Maximum number of iterations.
     tolerance : float
         Convergence tolerance.
+    return_result : bool
+        Whether to return an :class:`IterativeResult` with the convergence history instead of
+        the solution only.
 
     Returns
     --------
-    x : numpy.ndarray
+    x : numpy.ndarray or IterativeResult
         Solution of the linear equations. Vector of length :math:`n`.
 
     Raises
     ------
     StopIteration
-        If maximum number of iterations specified by `max_iterations` is reached.
+        If maximum number of iterations specified by `max_iterations` is reached and
+        `return_result` is False.
     """
     if x0 is None:
         x = b.copy()
     else:
         x = x0
 
+    result = IterativeResult(x, max_iterations) if return_result else None
+
     q = np.diag(np.diag(a))
     for _ in range(max_iterations):
         dx = np.linalg.solve(q, b - a @ x)
 
         x += dx
 
+        if result is not None:
+            result.record(np.linalg.norm(b - a @ x), np.linalg.norm(dx))
+
         if np.linalg.norm(dx) < tolerance:
-            return x
+            return x if result is None else result.finish(converged=True)
+
+    if result is not None:
+        return result.finish(converged=False)
 
     raise StopIteration
@@ -5,8 +5,13 @@ The python code draws on Romero-Aguilar (2020, :cite:`CompEcon`).
 """
 import numpy as np
 
+from labs.linear_equations.linear_algorithms import lu_factor
+from labs.linear_equations.linear_algorithms import lu_solve
+from labs.linear_equations.linear_algorithms import solve_batched
+from labs.nonlinear_equations.nonlinear_jacobian import get_jacobian
 
-def bisect(f, a, b, tolerance=1.5e-8):
+
+def bisect(f, a, b, tolerance=1.5e-8, history="full"):
     """Apply bisect method to root finding problem.
 
     Iterative procedure to find the root of a continuous real-values function :math:`f(x)` defined
@@ -17,30 +22,46 @@ def bisect(f, a, b, tolerance=1.5e-8):
     the root of :math:`f`) and is again bisected until the size of the subinterval containing the
     root reaches a specified convergence tolerance.
 
+    Many independent roots can be found at once by passing arrays of brackets. The function is
+    then evaluated once per iteration on the whole array of midpoints and each bracket is only
+    updated until it reaches the convergence tolerance, so that all roots are found in as many
+    function calls as the widest bracket needs.
+
     Parameters
     ----------
     f : callable
-        Continuous, real-valued, univariate function :math:`f(x)`.
-    a : int or float
+        Continuous, real-valued, univariate function :math:`f(x)`. If :math:`a` and :math:`b`
+        are arrays, it is applied elementwise to an array of the same shape.
+    a : int, float, or numpy.ndarray
         Lower bound :math:`a` for :math:`x \\in [a,b]`.
-    b : int or float
+    b : int, float, or numpy.ndarray
         Upper bound :math:`a` for :math:`x \\in [a,b]`. Select :math:`a` and :math:`b` so
         that :math:`f(b)` has different sign than :math:`f(a)`.
     tolerance : float
         Convergence tolerance.
+    history : str, int, callable, or None
+        Iterates to keep, see :func:`fixpoint`.
 
     Returns
     -------
-    x : float
+    x : float or numpy.ndarray
         Solution to the root finding problem within specified tolerance.
+    xvals : numpy.ndarray or None
+        Iterates of :math:`x` kept according to `history`, stacked along the first axis.
 
     Examples
     --------
     >>> x = bisect(f=lambda x : x ** 3 - 2, a=1, b=2)[0]
     >>> round(x, 4)
     1.2599
+    >>> x = bisect(f=lambda x : x ** 3 - np.array([2, 3]), a=[1, 1], b=[2, 2])[0]
+    >>> np.round(x, 4)
+    array([1.2599, 1.4422])
 
     """
+    a = np.asarray(a, dtype=np.double)
+    b = np.asarray(b, dtype=np.double)
+
     # Get sign for f(a).
     s = np.sign(f(a))
 
@@ -48,38 +69,200 @@ def bisect(f, a, b, tolerance=1.5e-8):
     x = (a + b) / 2
     d = (b - a) / 2
 
+    # The widest bracket determines the number of iterations, so the iterates can be stored in
+    # a preallocated array.
+    iterations, width = 0, np.max(d)
+    while width > tolerance:
+        width = width / 2
+        iterations += 1
+
+    xvals = _History(history, x, length=iterations + 1)
+
     # Continue operation as long as d is above the convergence tolerance threshold.
     # Update x by adding or subtracting value of d depending on sign of f.
-    xvals = [x]
-
-    while d > tolerance:
-        d = d / 2
-        if s == np.sign(f(x)):
-            x += d
-        else:
-            x -= d
+    for k in range(1, iterations + 1):
+        active = d > tolerance
+        d = np.where(active, d / 2, d)
+        step = np.where(s == np.sign(f(x)), d, -d)
+        x = x + np.where(active, step, 0)
 
         xvals.append(x)
 
-    return x, np.array(xvals)
+    if np.ndim(x) == 0:
+        x = float(x)
+
+    return x, xvals.values()
+
 
+def brent(f, a, b, tolerance=1.5e-8, max_iterations=100):
+    """Apply Brent's method to root finding problem.
+
+    Like :func:`bisect`, the method maintains an interval :math:`[a, b]` that brackets the root
+    of :math:`f`. Instead of always bisecting the interval, it proposes a step by inverse
+    quadratic interpolation through the last three iterates or, if only two are available, by
+    the secant method. The interpolation step is accepted only if it stays within the bracket
+    and shrinks it sufficiently fast, otherwise the method falls back to a bisection step. It
+    thus keeps the convergence guarantee of bisection, but converges superlinearly for smooth
+    functions (Brent, 1973, :cite:`brent1973algorithms`, Chapter 4).
+
+    Parameters
+    ----------
+    f : callable
+        Continuous, real-valued, univariate function :math:`f(x)`.
+    a : int or float
+        Lower bound :math:`a` for :math:`x \\in [a,b]`.
+    b : int or float
+        Upper bound :math:`b` for :math:`x \\in [a,b]`. Select :math:`a` and :math:`b` so
+        that :math:`f(b)` has different sign than :math:`f(a)`.
+    tolerance : float
+        Convergence tolerance.
+    max_iterations : int
+        Maximum number of iterations.
+
+    Returns
+    -------
+    x : float
+        Solution to the root finding problem within specified tolerance.
+    xvals : numpy.ndarray
+        Iterates of :math:`x`.
+
+    Raises
+    ------
+    ValueError
+        If :math:`f(a)` and :math:`f(b)` have the same sign.
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
+
+    Examples
+    --------
+    >>> x, xvals = brent(f=lambda x : x ** 3 - 2, a=1, b=2)
+    >>> round(x, 4)
+    1.2599
+    >>> len(xvals) < len(bisect(f=lambda x : x ** 3 - 2, a=1, b=2)[1]) / 3
+    True
 
-def fixpoint(f, x0, tolerance=10e-5):
+    """
+    a, b = float(a), float(b)
+    fa, fb = f(a), f(b)
+    if np.sign(fa) == np.sign(fb) and fa != 0:
+        raise ValueError("f(a) and f(b) must have different signs.")
+
+    # The root is bracketed by b, the current estimate, and the contrapoint c. The previous
+    # estimate is a, and d and e are the last and second to last steps.
+    c, fc = a, fa
+    d = e = b - a
+    xvals = [b]
+
+    for _ in range(max_iterations):
+        if np.sign(fb) == np.sign(fc) and fb != 0:
+            c, fc = a, fa
+            d = e = b - a
+
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+
+        tol = 2 * np.spacing(1.0) * abs(b) + tolerance / 2
+        m = (c - b) / 2
+        if abs(m) <= tol or fb == 0:
+            if b != xvals[-1]:
+                xvals.append(b)
+            return b, np.array(xvals)
+
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # Secant step.
+                p, q = 2 * m * s, 1 - s
+            else:
+                # Inverse quadratic interpolation step.
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+
+            # Accept the interpolation step only if it falls within the bracket and is smaller
+            # than half of the second to last step.
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+
+        a, fa = b, fb
+        b += d if abs(d) > tol else np.copysign(tol, m)
+        fb = f(b)
+        xvals.append(b)
+
+    raise StopIteration
+
+
+def fixpoint(
+    f,
+    x0,
+    tolerance=10e-5,
+    method="iteration",
+    memory=5,
+    max_iterations=None,
+    return_info=False,
+    history="full",
+):
     """Compute fixed point using function iteration.
 
+    Plain function iteration converges linearly with a rate equal to the contraction modulus of
+    :math:`f`, which is slow for moduli close to one. Two methods accelerate the convergence.
+    Steffensen's method applies Aitken's :math:`\\Delta^2` extrapolation to each element of
+    :math:`x` after two steps of function iteration. Anderson acceleration combines the last
+    `memory` function values such that the corresponding linear combination of the residuals
+    :math:`f(x) - x` has minimal norm (Walker and Ni, 2011, :cite:`walker2011anderson`). The
+    differences of the function values and residuals are stored in ring buffers of fixed size.
+
+    By default, all iterates are kept, which requires memory proportional to the number of
+    iterations times the size of :math:`x`. Keeping no iterates, the last :math:`k` iterates in
+    a preallocated ring buffer, or passing each iterate to a callback instead bounds the memory
+    by a multiple of the size of :math:`x`.
+
     Parameters
     ----------
     f : callable
         Function :math:`f(x)`.
-    x0 : float
+    x0 : float or numpy.ndarray
         Initial guess for fixed point (starting value for function iteration).
     tolerance : float
         Convergence tolerance (tolerance < 1).
+    method : str
+        Method, one of "iteration", "steffensen", or "anderson".
+    memory : int
+        Number of previous iterates used by Anderson acceleration.
+    max_iterations : int, default None
+        Maximum number of iterations. The number of iterations is not limited if None.
+    return_info : bool
+        Whether to return a dictionary with the number of ``"iterations"`` and the final
+        ``"residual"`` as well.
+    history : str, int, callable, or None
+        Iterates to keep, either "full" for all iterates, a positive integer :math:`k` for the
+        last :math:`k` iterates, or None for no iterates. A callable is called with each iterate
+        instead.
 
     Returns
     -------
-    x : float
+    x : float or numpy.ndarray
         Solution of function iteration.
+    xvals : numpy.ndarray or None
+        Iterates of :math:`x` kept according to `history`, stacked along the first axis. None
+        if no iterates are kept.
+    info : dict
+        Information on the convergence, only if `return_info` is True.
+
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
 
     Examples
     --------
@@ -87,65 +270,449 @@ def fixpoint(f, x0, tolerance=10e-5):
     >>> x = fixpoint(f=lambda x : x**0.5, x0=0.4, tolerance=1e-10)[0]
     >>> np.allclose(x, 1)
     True
+    >>> x, _, info = fixpoint(np.cos, 1.0, 1e-10, method="steffensen", return_info=True)
+    >>> np.allclose(x, np.cos(x)), info["iterations"]
+    (True, 4)
 
     """
+    if method not in ["iteration", "steffensen", "anderson"]:
+        raise ValueError(f"Unknown method: {method}.")
+
+    if method == "anderson":
+        size = np.size(x0)
+        df, dg = np.zeros((memory, size)), np.zeros((memory, size))
+        fx_old = g_old = None
+
     e = 1
-    xvals = [x0]
+    iterations = 0
+    xvals = _History(history, x0)
 
     while e > tolerance:
+        if max_iterations is not None and iterations >= max_iterations:
+            raise StopIteration
+
         # Fixed point equation.
-        x = f(x0)
+        fx = f(x0)
         # Error at the current step.
-        e = np.linalg.norm(x0 - x)
+        e = np.linalg.norm(x0 - fx)
+
+        if method == "iteration":
+            x = fx
+        elif method == "steffensen":
+            ffx = f(fx)
+            denominator = ffx - 2 * fx + x0
+            is_zero = denominator == 0
+            x = np.where(is_zero, ffx, x0 - (fx - x0) ** 2 / np.where(is_zero, 1, denominator))[()]
+        else:
+            g = np.ravel(fx - x0)
+            if g_old is not None:
+                slot = (iterations - 1) % memory
+                df[slot], dg[slot] = np.ravel(fx - fx_old), g - g_old
+            fx_old, g_old = fx, g
+
+            used = min(iterations, memory)
+            gamma = np.linalg.lstsq(dg[:used].T, g, rcond=None)[0]
+            x = fx - np.reshape(gamma @ df[:used], np.shape(fx))
+
+        iterations += 1
         x0 = x
         xvals.append(x0)
-    return x, np.array(xvals)
 
+    if return_info:
+        return x, xvals.values(), {"iterations": iterations, "residual": e}
+
+    return x, xvals.values()
 
-def funcit(f, x0=2):
-    """Apply function iteration using the fixpoint method."""
+
+def funcit(f, x0=2, **kwargs):
+    """Apply function iteration using the fixpoint method.
+
+    Keyword arguments, for example the `method`, are passed on to :func:`fixpoint`.
+
+    """
     f_original = f
     f = lambda z: z - f_original(z)  # noqa
-    x = fixpoint(f, x0)
+    x = fixpoint(f, x0, **kwargs)
     f = f_original
     return x
 
 
-def newton_method(f, x0, tolerance=1.5e-8):
+def newton_method(
+    f,
+    x0,
+    tolerance=1.5e-8,
+    max_iterations=100,
+    jacobian=None,
+    refactor_every=1,
+    line_search=False,
+):
     """Apply Newton's method to solving nonlinear equation.
 
     Solve equation using successive linearization, which replaces the nonlinear problem
     by a sequence of linear problems whose solutions converge to the solution of the nonlinear
-    problem.
+    problem. Each iteration solves :math:`J(x) \\Delta x = -f(x)` using the LU factorization of
+    the linear equations lab.
+
+    Factorizing the Jacobian is often the most expensive part of an iteration. The chord method
+    (Shamanskii method) thus reuses the factorization for `refactor_every` iterations, or until
+    the norm of :math:`f` decreases by less than half in an iteration. The convergence then is
+    only linear (superlinear), but each iteration is cheaper.
+
+    Far from the root, a full Newton step may increase :math:`\\|f(x)\\|` and the iteration
+    may diverge. A backtracking line search halves the step :math:`t` until the Armijo condition
+    :math:`\\|f(x + t \\Delta x)\\|^2 \\leq (1 - 2 \\alpha t) \\|f(x)\\|^2` holds. The last trial
+    point is evaluated only once and reused in the next iteration.
 
     Parameters
     ----------
     f : callable
-        (Univariate) function :math:`f(x)`.
-    x0 : float
+        Function that returns the tuple :math:`(f(x), J(x))` of the function value, a vector of
+        length :math:`n`, and the Jacobian, a matrix of dimension :math:`n \\times n`. If
+        `jacobian` is given, it returns :math:`f(x)` only. In the univariate case, scalars may be
+        returned instead.
+    x0 : float or numpy.ndarray
         Initial guess for the root of :math:`f`.
     tolerance : float
         Convergence tolerance.
+    max_iterations : int
+        Maximum number of iterations.
+    jacobian : callable, default None
+        Function that returns the Jacobian :math:`J(x)`, which is then only evaluated when it is
+        factorized. Exact Jacobians are obtained from a plain function by :func:`autodiff`,
+        either as ``newton_method(autodiff(f), x0)`` or as
+        ``newton_method(f, x0, jacobian=autodiff(f, return_value=False))``.
+    refactor_every : int
+        Number of iterations between factorizations of the Jacobian.
+    line_search : bool
+        Whether to apply a backtracking line search.
 
     Returns
     -------
-    xn : float
+    xn : numpy.ndarray
         Solution of function iteration.
 
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
+
+    Examples
+    --------
+    >>> def f(x):
+    ...     return np.array([x[0] ** 2 + x[1] ** 2 - 2, x[0] - x[1]]), np.array(
+    ...         [[2 * x[0], 2 * x[1]], [1, -1]]
+    ...     )
+    >>> newton_method(f, [2.0, 0.5])
+    array([1., 1.])
+
     """
-    x0 = np.atleast_1d(x0)
+    xn = np.atleast_1d(np.array(x0, dtype=np.double))
 
-    # This is tailored to the univariate case.
-    assert x0.shape[0] == 1
+    def evaluate(x):
+        if jacobian is None:
+            fval, jac = f(x)
+        else:
+            fval, jac = f(x), None
+        return np.atleast_1d(fval), jac
 
-    xn = x0.copy()
+    fxn, jxn = evaluate(xn)
+    factorization, age = None, refactor_every
 
-    while True:
-        fxn, gxn = f(xn)
-        if np.linalg.norm(fxn) < tolerance:
+    for _ in range(max_iterations):
+        norm = np.linalg.norm(fxn)
+        if norm < tolerance:
             return xn
+
+        if age >= refactor_every:
+            if jxn is None:
+                jxn = jacobian(xn)
+            factorization, age = lu_factor(np.atleast_2d(jxn)), 0
+
+        dx = -lu_solve(factorization, fxn)
+        age += 1
+
+        step = 1.0
+        x_trial = xn + dx
+        f_trial, j_trial = evaluate(x_trial)
+        if line_search:
+            while not _is_sufficient_decrease(f_trial, norm, step) and step > 1e-10:
+                step /= 2
+                x_trial = xn + step * dx
+                f_trial, j_trial = evaluate(x_trial)
+
+            # A failed line search with an outdated Jacobian is retried with a new one.
+            if not _is_sufficient_decrease(f_trial, norm, step) and age > 1:
+                age = refactor_every
+                continue
+
+        # Refactorize if the chord method converges slowly.
+        if np.linalg.norm(f_trial) > 0.5 * norm:
+            age = refactor_every
+
+        xn, fxn, jxn = x_trial, f_trial, j_trial
+
+    raise StopIteration
+
+
+def newton_method_batched(f, x0, tolerance=1.5e-8, max_iterations=100, params=None):
+    """Apply Newton's method to a batch of nonlinear equations.
+
+    Solves :math:`f(x_i; \\theta_i) = 0` for many starting points :math:`x_i` and, optionally,
+    parameters :math:`\\theta_i` at once, for example to map the basins of attraction of the
+    roots or to sweep over parameter values. Each iteration evaluates :math:`f` once on all
+    elements of the batch that have not converged yet and solves their Newton equations with
+    :func:`solve_batched`. Elements that converge, reach a singular Jacobian, or produce
+    non-finite values are frozen by a mask and no longer evaluated.
+
+    Parameters
+    ----------
+    f : callable
+        Function that returns the tuple :math:`(f(x), J(x))` for a batch of points. For a batch
+        of :math:`m` points of dimension :math:`n`, the function values are of dimension
+        :math:`m \\times n` and the Jacobians of dimension :math:`m \\times n \\times n`. In the
+        univariate case, both are vectors of length :math:`m`. If `params` is given, it is
+        called as ``f(x, params)`` with the parameters of the same elements.
+    x0 : numpy.ndarray
+        Starting points, either a vector of length :math:`m` in the univariate case or a matrix
+        of dimension :math:`m \\times n`.
+    tolerance : float
+        Convergence tolerance.
+    max_iterations : int
+        Maximum number of iterations.
+    params : numpy.ndarray, default None
+        Parameters of each element, stacked along the first axis.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        Final iterates with the same shape as `x0`.
+    converged : numpy.ndarray
+        Boolean vector of length :math:`m` indicating the elements that converged.
+    iterations : numpy.ndarray
+        Number of iterations of each element.
+
+    Examples
+    --------
+    >>> def f(x, c):
+    ...     return x ** 3 - c, 3 * x ** 2
+    >>> x, converged, iterations = newton_method_batched(f, np.ones(3), params=np.arange(1, 4))
+    >>> np.allclose(x, np.cbrt(np.arange(1, 4))), bool(converged.all()), iterations
+    (True, True, array([0, 4, 5]))
+
+    """
+    x = np.array(x0, dtype=np.double)
+    univariate = x.ndim == 1
+    if univariate:
+        x = x[:, np.newaxis]
+
+    m, n = x.shape
+    converged = np.zeros(m, dtype=bool)
+    iterations = np.zeros(m, dtype=int)
+
+    active = np.arange(m)
+    while active.size > 0:
+        args = () if params is None else (params[active],)
+        fval, jac = f(x[active, 0] if univariate else x[active], *args)
+        fval = np.reshape(fval, (active.size, n))
+        jac = np.reshape(jac, (active.size, n, n))
+
+        norm = np.linalg.norm(fval, axis=1)
+        converged[active] = norm < tolerance
+        keep = ~converged[active] & np.isfinite(norm) & (iterations[active] < max_iterations)
+        active, fval, jac = active[keep], fval[keep], jac[keep]
+        if active.size == 0:
+            break
+
+        dx, singular = solve_batched(jac, -fval)
+        active, dx = active[~singular], dx[~singular]
+        x[active] += dx
+        iterations[active] += 1
+
+    return x[:, 0] if univariate else x, converged, iterations
+
+
+def broyden(
+    f,
+    x0,
+    tolerance=1.5e-8,
+    max_iterations=100,
+    inverse_jacobian=None,
+    memory=None,
+    return_inverse=False,
+    jacobian=None,
+):
+    """Apply Broyden's method to solving nonlinear equation.
+
+    Broyden's method is a quasi-Newton method that replaces the Jacobian in Newton's method by an
+    approximation, which is updated from the change of the function value along each step. We
+    update the approximation :math:`H` to the inverse Jacobian directly. By the Sherman-Morrison
+    formula, Broyden's rank-1 update of the Jacobian translates into the rank-1 update
+
+    .. math::
+
+       H \\leftarrow H + \\frac{(s - Hy) s^T H}{s^T H y}
+
+    with step :math:`s` and change in function value :math:`y`. Each iteration thus requires a
+    single function evaluation and :math:`O(n^2)` operations instead of the :math:`O(n^3)`
+    operations of a factorization. For large :math:`n`, the limited-memory variant stores only
+    the last `memory` update vectors and requires :math:`O(mn)` operations and storage per
+    iteration in addition to those of the initial approximation. By default, the initial
+    approximation is the LU factorization of the Jacobian at `x0`, which costs :math:`n`
+    function evaluations for its forward difference approximation, :math:`O(n^3)` operations,
+    and :math:`O(n^2)` storage, and :math:`O(n^2)` operations per iteration to apply. A
+    multiple of the identity or a diagonal matrix as initial approximation avoids these costs.
+
+    Parameters
+    ----------
+    f : callable
+        Function :math:`f(x)` that returns a vector of length :math:`n`.
+    x0 : float or numpy.ndarray
+        Initial guess for the root of :math:`f`.
+    tolerance : float
+        Convergence tolerance.
+    max_iterations : int
+        Maximum number of iterations.
+    inverse_jacobian : float, numpy.ndarray, tuple, or InverseJacobian, default None
+        Initial approximation to the inverse Jacobian as accepted by :class:`InverseJacobian`,
+        or the approximation returned by a previous solve, which is then updated in place. If
+        None, the LU factorization of the Jacobian at `x0` is used.
+    memory : int, default None
+        Number of update vectors stored by the limited-memory variant. All updates are applied
+        to a dense matrix if None.
+    return_inverse : bool
+        Whether to return the approximation to the inverse Jacobian as well.
+    jacobian : callable, default None
+        Function that returns the Jacobian :math:`J(x)`, for example
+        ``autodiff(f, return_value=False)``, which is evaluated at `x0` if `inverse_jacobian` is
+        None. The Jacobian is approximated by forward differences if None.
+
+    Returns
+    -------
+    xn : numpy.ndarray
+        Solution of the nonlinear equation.
+    inverse_jacobian : InverseJacobian
+        Approximation to the inverse Jacobian at the solution, only if `return_inverse` is
+        True.
+
+    Raises
+    ------
+    StopIteration
+        If maximum number of iterations specified by `max_iterations` is reached.
+
+    Examples
+    --------
+    >>> x = broyden(lambda x: np.exp(x) - 1, 2.0, inverse_jacobian=np.exp(-2))
+    >>> np.allclose(x, 0)
+    True
+
+    """
+    xn = np.atleast_1d(np.array(x0, dtype=np.double))
+    fxn = np.atleast_1d(f(xn))
+
+    if not isinstance(inverse_jacobian, InverseJacobian):
+        if inverse_jacobian is None:
+            jxn = get_jacobian(f, xn, fxn) if jacobian is None else np.atleast_2d(jacobian(xn))
+            inverse_jacobian = lu_factor(jxn)
+        inverse_jacobian = InverseJacobian(inverse_jacobian, xn.size, memory)
+
+    for _ in range(max_iterations):
+        if np.linalg.norm(fxn) < tolerance:
+            return (xn, inverse_jacobian) if return_inverse else xn
+
+        dx = -(inverse_jacobian @ fxn)
+        xn = xn + dx
+
+        fxn, fxn_old = np.atleast_1d(f(xn)), fxn
+        inverse_jacobian.update(dx, fxn - fxn_old)
+
+    raise StopIteration
+
+
+class InverseJacobian:
+    """Approximation to the inverse Jacobian for Broyden's method.
+
+    The approximation is either stored as a dense matrix, to which each rank-1 update is
+    added, or in limited-memory form as the initial approximation :math:`H_0` and the last
+    :math:`m` pairs of update vectors,
+
+    .. math::
+
+       H = H_0 + \\sum_{i=1}^m u_i w_i^T.
+
+    The update vectors are kept in preallocated arrays, where the newest pair replaces the
+    oldest one once all :math:`m` slots are in use.
+
+    Parameters
+    ----------
+    initial : float, numpy.ndarray, or tuple
+        Initial approximation, either a multiple of the identity, the diagonal of a diagonal
+        matrix as a vector of length :math:`n`, a matrix of dimension :math:`n \\times n`, or
+        the LU factorization ``(lu, piv)`` of the Jacobian as returned by :func:`lu_factor`. In
+        the limited-memory form, the first two require :math:`O(n)` storage and the factorization
+        is applied by :func:`lu_solve` without forming the inverse.
+    n : int
+        Number of unknowns.
+    memory : int, default None
+        Number of stored pairs of update vectors. The approximation is stored as a dense matrix
+        if None.
+
+    """
+
+    def __init__(self, initial, n, memory=None):
+        """Store the initial approximation and allocate the update vectors."""
+        if memory is None:
+            self._dense = self._apply_initial(initial, np.eye(n))
         else:
-            xn = xn - fxn / gxn
+            self._dense = None
+            self._initial = initial
+            self._u = np.zeros((memory, n))
+            self._w = np.zeros((memory, n))
+            self._updates = 0
+
+    def __matmul__(self, v):
+        """Multiply a vector by the approximation."""
+        if self._dense is not None:
+            return self._dense @ v
+
+        return self._apply_initial(self._initial, v) + self._u.T @ (self._w @ v)
+
+    def rmatvec(self, v):
+        """Multiply a vector by the transposed approximation."""
+        if self._dense is not None:
+            return self._dense.T @ v
+
+        return self._apply_initial(self._initial, v, trans=True) + self._w.T @ (self._u @ v)
+
+    def update(self, s, y):
+        """Apply Broyden's update for step :math:`s` and change in function value :math:`y`."""
+        hy = self @ y
+        denominator = s @ hy
+        if denominator == 0:
+            return
+
+        u = (s - hy) / denominator
+        w = self.rmatvec(s)
+
+        if self._dense is not None:
+            self._dense += np.outer(u, w)
+        else:
+            slot = self._updates % len(self._u)
+            self._u[slot], self._w[slot] = u, w
+            self._updates += 1
+
+    @staticmethod
+    def _apply_initial(initial, v, trans=False):
+        """Multiply a vector or matrix by the (transposed) initial approximation."""
+        if isinstance(initial, tuple):
+            return lu_solve(initial, v, trans=trans)
+
+        initial = np.asarray(initial, dtype=np.double)
+        if initial.ndim == 0:
+            return initial * v
+        if initial.ndim == 1:
+            return initial[:, np.newaxis] * v if v.ndim == 2 else initial * v
+
+        return (initial.T if trans else initial) @ v
 
 
 def fischer(u, v, sign):
@@ -168,3 +735,52 @@ def fischer(u, v, sign):
 
     """
     return u + v + sign * np.sqrt(u ** 2 + v ** 2)
+
+
+class _History:
+    """Keep the iterates of a solver according to its history option."""
+
+    def __init__(self, history, x, length=None):
+        """Allocate the storage for the iterates and record the starting value."""
+        self._history = history
+        self._count = 0
+
+        is_length = isinstance(history, (int, np.integer)) and not isinstance(history, bool)
+        if isinstance(history, str) and history == "full":
+            self._iterates = [] if length is None else np.empty((length,) + np.shape(x))
+        elif is_length and history >= 1:
+            self._iterates = np.empty((history,) + np.shape(x))
+        elif is_length or not (history is None or callable(history)):
+            raise ValueError(f"Unknown history: {history}.")
+
+        self.append(x)
+
+    def append(self, x):
+        """Record an iterate."""
+        if self._history == "full" and isinstance(self._iterates, list):
+            self._iterates.append(x)
+        elif self._history == "full":
+            self._iterates[self._count] = x
+        elif isinstance(self._history, (int, np.integer)):
+            self._iterates[self._count % len(self._iterates)] = x
+        elif callable(self._history):
+            self._history(x)
+
+        self._count += 1
+
+    def values(self):
+        """Get the kept iterates in the order of the iterations."""
+        if self._history == "full":
+            return np.array(self._iterates[: self._count])
+        elif isinstance(self._history, (int, np.integer)):
+            k = len(self._iterates)
+            if self._count <= k:
+                return self._iterates[: self._count]
+            return np.roll(self._iterates, -(self._count % k), axis=0)
+
+        return None
+
+
+def _is_sufficient_decrease(f_trial, norm, step, alpha=1e-4):
+    """Check the Armijo condition for the squared norm of the function value."""
+    return np.sum(f_trial ** 2) <= (1 - 2 * alpha * step) * norm ** 2
@@ -1,10 +1,26 @@
 """Tests for nonlinear equations lab."""
+from itertools import product
+
 import numpy as np
+import pytest
+from scipy import sparse
 from scipy.optimize import bisect as sp_bisect
 
 from labs.nonlinear_equations.nonlinear_algorithms import bisect
+from labs.nonlinear_equations.nonlinear_algorithms import brent
+from labs.nonlinear_equations.nonlinear_algorithms import broyden
 from labs.nonlinear_equations.nonlinear_algorithms import fixpoint
+from labs.nonlinear_equations.nonlinear_algorithms import funcit
 from labs.nonlinear_equations.nonlinear_algorithms import newton_method
+from labs.nonlinear_equations.nonlinear_algorithms import newton_method_batched
+from labs.nonlinear_equations.nonlinear_autodiff import autodiff
+from labs.nonlinear_equations.nonlinear_jacobian import get_column_coloring
+from labs.nonlinear_equations.nonlinear_jacobian import get_jacobian
+from labs.nonlinear_equations.nonlinear_problems import bisection_test_function
+from labs.nonlinear_equations.nonlinear_problems import get_spacial_market
+from labs.nonlinear_equations.nonlinear_problems import newton_pathological_example_fval
+from labs.optimization.optimization_problems import get_test_function
+from labs.optimization.optimization_problems import get_test_function_gradient
 
 
 def test_1():
@@ -43,3 +59,345 @@ def test_3():
 
     x = newton_method(f, 0.4)
     np.testing.assert_almost_equal(f(x)[0], 0)
+
+
+def test_4():
+    """Bisection method is working on arrays of brackets."""
+    c = np.linspace(2, 7, 1000)
+    calls = []
+
+    def example(x):
+        calls.append(x)
+        return x ** 3 - c
+
+    x, xvals = bisect(example, np.ones_like(c), np.full_like(c, 2))
+    np.testing.assert_almost_equal(x, np.cbrt(c))
+    assert xvals.shape == (len(calls), c.size)
+    assert len(calls) <= np.ceil(np.log2(1 / 1.5e-8)) + 1
+
+    for c_, x_ in zip(c[::100], x[::100]):
+        np.testing.assert_almost_equal(bisect(lambda z, c_=c_: z ** 3 - c_, 1, 2)[0], x_)
+
+
+def test_5():
+    """Brent's method is working."""
+    problems = [
+        (bisection_test_function, 1, 2),
+        (lambda x: np.exp(x) - 5, 0, 3),
+        (lambda x: np.cos(x) - x, 0, 1),
+        (newton_pathological_example_fval, -0.5, 2),
+    ]
+    for f, a, b in problems:
+        x, xvals = brent(f, a, b)
+        assert x == xvals[-1]
+        np.testing.assert_almost_equal(x, sp_bisect(f, a, b), decimal=7)
+        assert len(xvals) < len(bisect(f, a, b)[1])
+
+    assert 3 * len(brent(bisection_test_function, 1, 2)[1]) < len(
+        bisect(bisection_test_function, 1, 2)[1]
+    )
+
+    with pytest.raises(ValueError, match="different signs"):
+        brent(bisection_test_function, 2, 3)
+
+
+def test_6():
+    """Newton method is working for systems with Jacobian reuse and line search."""
+    n = 20
+
+    def value(x):
+        fval = (3 - 2 * x) * x + 1
+        fval[1:] -= x[:-1]
+        fval[:-1] -= 2 * x[1:]
+        return fval
+
+    def jacobian(x):
+        return np.diag(3 - 4 * x) - np.eye(n, k=-1) - 2 * np.eye(n, k=1)
+
+    evaluations, calls = [], []
+    for refactor_every in [1, 3, 10]:
+        calls.clear()
+        x = newton_method(
+            lambda z: calls.append("f") or value(z),
+            -np.ones(n),
+            jacobian=lambda z: calls.append("j") or jacobian(z),
+            refactor_every=refactor_every,
+        )
+        np.testing.assert_almost_equal(value(x), 0)
+        evaluations.append(calls.count("j"))
+
+    assert evaluations[0] > evaluations[1] > evaluations[2]
+
+    def example(x):
+        return np.arctan(x), 1 / (1 + x ** 2)
+
+    for refactor_every in [1, 5]:
+        x = newton_method(example, 10.0, line_search=True, refactor_every=refactor_every)
+        np.testing.assert_almost_equal(x, 0)
+
+    with pytest.raises(StopIteration):
+        newton_method(example, 1.0, max_iterations=2)
+
+
+def test_7():
+    """Broyden method is working in dense and limited-memory form."""
+    n = 50
+
+    def value(x, c=1.0):
+        fval = (3 - 2 * x) * x + c
+        fval[1:] -= x[:-1]
+        fval[:-1] -= 2 * x[1:]
+        return fval
+
+    x, inverse_jacobian = broyden(value, -np.ones(n), return_inverse=True)
+    np.testing.assert_almost_equal(value(x), 0)
+
+    for memory in [5, 100]:
+        x_limited = broyden(value, -np.ones(n), memory=memory)
+        np.testing.assert_almost_equal(x_limited, x)
+
+    x_scalar = broyden(value, -np.ones(n), inverse_jacobian=1 / 7, memory=10)
+    np.testing.assert_almost_equal(x_scalar, x)
+
+    # With a diagonal initial approximation, storage and evaluations do not grow with n ** 2.
+    n_large, memory, calls = 2000, 10, []
+    x_large, inverse_large = broyden(
+        lambda z: calls.append(z) or value(z),
+        -np.ones(n_large),
+        inverse_jacobian=np.full(n_large, 1 / 7),
+        memory=memory,
+        return_inverse=True,
+    )
+    np.testing.assert_almost_equal(value(x_large), 0)
+    stored = [a for a in vars(inverse_large).values() if isinstance(a, np.ndarray)]
+    assert sum(a.size for a in stored) <= (2 * memory + 1) * n_large
+    assert len(calls) < 100
+
+    # Carry the approximation over to a similar problem.
+    calls = []
+    x_warm = broyden(
+        lambda z: calls.append(z) or value(z, 1.05), x, inverse_jacobian=inverse_jacobian
+    )
+    np.testing.assert_almost_equal(value(x_warm, 1.05), 0)
+    assert len(calls) < n
+
+    with pytest.raises(StopIteration):
+        broyden(value, -np.ones(n), max_iterations=2)
+
+
+def test_8():
+    """Accelerated fixpoint methods are working."""
+    x, _, info = fixpoint(np.cos, 1.0, 1e-10, return_info=True)
+    for method in ["steffensen", "anderson"]:
+        x_accelerated, xvals, info_accelerated = fixpoint(
+            np.cos, 1.0, 1e-10, method=method, return_info=True
+        )
+        np.testing.assert_almost_equal(x_accelerated, x)
+        assert len(xvals) == info_accelerated["iterations"] + 1
+        assert info_accelerated["iterations"] < info["iterations"] / 5
+        assert info_accelerated["residual"] <= 1e-10
+
+    # Bellman-type map with contraction modulus close to one.
+    rng = np.random.default_rng(0)
+    transition = rng.uniform(size=(50, 50))
+    transition /= transition.sum(axis=1, keepdims=True)
+    utility = rng.uniform(size=50)
+
+    def bellman(v):
+        return utility + 0.99 * transition @ v
+
+    v, _, info = fixpoint(bellman, np.zeros(50), 1e-8, method="anderson", return_info=True)
+    np.testing.assert_almost_equal(v, np.linalg.solve(np.eye(50) - 0.99 * transition, utility))
+    assert info["iterations"] < 50
+
+    with pytest.raises(StopIteration):
+        fixpoint(bellman, np.zeros(50), 1e-8, max_iterations=100)
+
+    x = funcit(lambda z: np.exp(z) - 2, x0=1.0, tolerance=1e-10, method="anderson")[0]
+    np.testing.assert_almost_equal(x, np.log(2))
+
+
+def test_9():
+    """History options of bisection and fixpoint methods are working."""
+    for method, args in [(bisect, (bisection_test_function, 1, 2)), (fixpoint, (np.cos, 1.0))]:
+        x, xvals = method(*args)
+
+        x_none, xvals_none = method(*args, history=None)
+        assert x_none == x
+        assert xvals_none is None
+
+        for k in [1, 5, len(xvals) + 1]:
+            x_last, xvals_last = method(*args, history=k)
+            assert x_last == x
+            np.testing.assert_array_equal(xvals_last, xvals[-k:])
+
+        iterates = []
+        x_callback, xvals_callback = method(*args, history=iterates.append)
+        assert x_callback == x
+        assert xvals_callback is None
+        np.testing.assert_array_equal(iterates, xvals)
+
+    for history in ["last", 0, -1, True]:
+        with pytest.raises(ValueError, match="Unknown history"):
+            fixpoint(np.cos, 1.0, history=history)
+
+
+def test_10():
+    """Batched Newton method is working for basins of attraction and parameter sweeps."""
+
+    def cube_roots_of_unity(x):
+        # Real and imaginary part of z ** 3 - 1 and the Jacobian by the Cauchy-Riemann equations.
+        z = x[..., 0] + 1j * x[..., 1]
+        fval, derivative = z ** 3 - 1, 3 * z ** 2
+        jac = np.stack(
+            [
+                np.stack([derivative.real, -derivative.imag], axis=-1),
+                np.stack([derivative.imag, derivative.real], axis=-1),
+            ],
+            axis=-2,
+        )
+        return np.stack([fval.real, fval.imag], axis=-1), jac
+
+    grid = np.linspace(-1, 1, 15)
+    x0 = np.array(list(product(grid, grid)))
+    x, converged, iterations = newton_method_batched(cube_roots_of_unity, x0)
+
+    for i in range(0, len(x0), 7):
+        if converged[i]:
+            np.testing.assert_almost_equal(x[i], newton_method(cube_roots_of_unity, x0[i]))
+    assert converged.mean() > 0.9
+    assert not converged[np.all(x0 == 0, axis=1)].any()
+    assert iterations.max() <= 100
+
+    def example(x, c):
+        return x ** 3 - c, 3 * x ** 2
+
+    c = np.linspace(1, 10, 100)
+    x, converged, iterations = newton_method_batched(example, np.ones_like(c), params=c)
+    assert converged.all()
+    np.testing.assert_almost_equal(x, np.cbrt(c))
+    assert iterations[0] == 0
+    assert iterations[-1] > iterations[1]
+
+
+def test_11():
+    """Finite difference Jacobians are working with vectorization and sparsity patterns."""
+
+    def f(x):
+        return np.stack([x[..., 0] ** 2 * x[..., 1], np.sin(x[..., 0]) + np.exp(x[..., 1])], -1)
+
+    x = np.array([0.5, -1.5])
+    expected = np.array([[2 * x[0] * x[1], x[0] ** 2], [np.cos(x[0]), np.exp(x[1])]])
+
+    for method, decimal in [("forward", 6), ("central", 9), ("complex", 14)]:
+        np.testing.assert_almost_equal(get_jacobian(f, x, method=method), expected, decimal)
+
+    calls = []
+
+    def counted(g):
+        def wrapper(x):
+            calls.append(x.shape)
+            return g(x)
+
+        return wrapper
+
+    np.testing.assert_almost_equal(get_jacobian(counted(f), x, vectorized=True), expected, 6)
+    assert calls == [(3, 2)]
+
+    # A tridiagonal system requires three evaluations regardless of its dimension.
+    def tridiagonal(x):
+        padded = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(1, 1)])
+        return padded[..., :-2] - 2 * x ** 3 + padded[..., 2:]
+
+    x = np.linspace(-1, 1, 50)
+    expected = np.diag(-6 * x ** 2) + np.eye(50, k=1) + np.eye(50, k=-1)
+    sparsity = sparse.diags([1, 1, 1], [-1, 0, 1], shape=(50, 50))
+    assert get_column_coloring(sparsity).max() == 2
+
+    calls.clear()
+    jacobian = get_jacobian(
+        counted(tridiagonal), x, tridiagonal(x), sparsity=sparsity, vectorized=True
+    )
+    assert sparse.issparse(jacobian)
+    assert calls == [(3, 50)]
+    np.testing.assert_almost_equal(jacobian.toarray(), expected, 6)
+    np.testing.assert_almost_equal(
+        get_jacobian(tridiagonal, x, method="complex", sparsity=sparsity.toarray()), expected
+    )
+
+    # Scalar-valued vectorized functions return a single value per point.
+    gradient = get_jacobian(lambda p: p[..., 0] ** 2 + p[..., 1], [3.0, 1.0], vectorized=True)
+    np.testing.assert_almost_equal(gradient, [[6.0, 1.0]], 6)
+
+    with pytest.raises(ValueError, match="Unknown method"):
+        get_jacobian(f, x, method="backward")
+
+
+def test_12():
+    """Forward-mode automatic differentiation is working with the nonlinear solvers."""
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        y = np.sqrt(x[0]) * np.exp(x[1]) + np.cbrt(x[0] * x[1]) - 2
+        y += np.sin(x[0]) ** 2
+        return np.stack([y, np.power(x[1], 3) - np.cos(x[0]), 0.5])
+
+    def jacobian(x):
+        cbrt = np.cbrt(x[0] * x[1])
+        return np.array(
+            [
+                [
+                    np.exp(x[1]) / (2 * np.sqrt(x[0])) + cbrt / (3 * x[0]) + np.sin(2 * x[0]),
+                    np.sqrt(x[0]) * np.exp(x[1]) + cbrt / (3 * x[1]),
+                ],
+                [np.sin(x[0]), 3 * x[1] ** 2],
+                [0, 0],
+            ]
+        )
+
+    x = np.array([0.7, 1.3])
+    fval, jac = autodiff(f)(x)
+    np.testing.assert_almost_equal(fval, f(x))
+    np.testing.assert_almost_equal(jac, jacobian(x), decimal=14)
+    assert len(calls) == 2
+
+    def g(x):
+        return np.stack([x[0] ** 2 + np.exp(x[1]) - 2, x[0] - np.sin(x[1])])
+
+    expected = newton_method(lambda x: (g(x), autodiff(g, return_value=False)(x)), [2.0, 0.5])
+    np.testing.assert_almost_equal(newton_method(autodiff(g), [2.0, 0.5]), expected)
+    np.testing.assert_almost_equal(
+        broyden(g, [2.0, 0.5], jacobian=autodiff(g, return_value=False)), expected
+    )
+
+    def kepler(x, e):
+        return x - e * np.sin(x) - 1
+
+    e = np.linspace(0, 0.9, 50)
+    x, converged, _ = newton_method_batched(autodiff(kepler, elementwise=True), e, params=e)
+    assert converged.all()
+    np.testing.assert_almost_equal(kepler(x, e), 0)
+
+    # Linear terms, reshaping, and grids as in the spatial market and Bellman examples.
+    x = np.linspace(1, 2, 9)
+    fval, jac = autodiff(lambda x: get_spacial_market(x)[0])(x)
+    np.testing.assert_almost_equal(fval, get_spacial_market(x)[0])
+    np.testing.assert_almost_equal(jac, get_jacobian(lambda x: get_spacial_market(x)[0], x), 6)
+
+    rng = np.random.default_rng(0)
+    transition, utility = rng.uniform(size=(5, 5)), rng.uniform(size=5)
+    jac = autodiff(lambda v: utility + 0.99 * transition @ v, return_value=False)(utility)
+    np.testing.assert_almost_equal(jac, 0.99 * transition)
+    jac = autodiff(lambda v: np.dot(v, transition) * v, return_value=False)(utility)
+    np.testing.assert_almost_equal(
+        jac, np.diag(utility @ transition) + utility[:, np.newaxis] * transition.T
+    )
+
+    x, a = np.array([0.3, -1.2, 2.0]), np.array([1.0, 2.0, 3.0])
+    fval, gradient = autodiff(get_test_function)(x, a, 1)
+    np.testing.assert_almost_equal(fval, get_test_function(x, a, 1))
+    np.testing.assert_almost_equal(gradient, get_test_function_gradient(x, a, 1))
+
+    with pytest.raises(TypeError):
+        autodiff(np.tan)(x)
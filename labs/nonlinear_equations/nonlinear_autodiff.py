@@ -0,0 +1,327 @@
+"""This module contains the automatic differentiation for the nonlinear equations lab.
+
+The materials follow Nocedal and Wright (2006, :cite:`nocedal2006numerical`) (Chapter 8). Each
+quantity in the evaluation of a function is paired with its directional derivatives, which are
+propagated through every elementary operation by the chain rule. Unlike the finite differences
+in :func:`get_jacobian`, the resulting Jacobian is exact up to rounding errors. A plain NumPy
+function is differentiated as is, since the elementary operations are dispatched to the
+:class:`Dual` numbers by the ufunc protocol of NumPy.
+
+"""
+import numpy as np
+
+
+def autodiff(f, elementwise=False, return_value=True):
+    """Differentiate a function by forward-mode automatic differentiation.
+
+    The function is evaluated once on :class:`Dual` numbers seeded with one direction per
+    element of :math:`x`, so that the cost is a small multiple of a function evaluation for
+    each unknown. For elementwise functions, a single direction suffices and the derivative is
+    returned with the shape of the function value, as required by
+    :func:`newton_method_batched` in the univariate case.
+
+    Parameters
+    ----------
+    f : callable
+        Function :math:`f(x)` that returns a scalar or a vector of length :math:`m` for a vector
+        of length :math:`n`. Additional arguments are passed on unchanged. It may use the
+        arithmetic operators, the matrix product of vectors and matrices with ``@`` or
+        :func:`numpy.dot`, :func:`numpy.exp`, :func:`numpy.log`, :func:`numpy.sqrt`,
+        :func:`numpy.cbrt`, :func:`numpy.power`, :func:`numpy.sin`, :func:`numpy.cos`,
+        :func:`numpy.absolute`, :func:`numpy.sum`, :func:`numpy.reshape`, :func:`numpy.stack`,
+        :func:`numpy.meshgrid`, and :func:`numpy.atleast_1d`, as well as the methods ``sum``,
+        ``reshape``, ``ravel``, and ``flatten``.
+    elementwise : bool
+        Whether :math:`f` applies to each element of :math:`x` separately.
+    return_value : bool
+        Whether to return the function value as well.
+
+    Returns
+    -------
+    derivative : callable
+        Function that returns the tuple :math:`(f(x), J(x))` with the Jacobian of dimension
+        :math:`m \\times n`, or only :math:`J(x)` if `return_value` is False. For scalar
+        :math:`x` and elementwise functions, :math:`J(x)` is of the same shape as :math:`f(x)`.
+
+    Examples
+    --------
+    >>> f = autodiff(lambda x: np.stack([x[0] * x[1], np.sin(x[0])]))
+    >>> fval, jac = f(np.array([1.0, 2.0]))
+    >>> np.allclose(jac, [[2.0, 1.0], [np.cos(1.0), 0.0]])
+    True
+    >>> a = np.array([[2.0, 1.0], [1.0, 3.0]])
+    >>> np.allclose(autodiff(lambda x: a @ x - 1, return_value=False)([0.0, 0.0]), a)
+    True
+    >>> from labs.nonlinear_equations.nonlinear_algorithms import newton_method
+    >>> newton_method(autodiff(lambda x: x ** 3 - 2), 0.4)
+    array([1.25992105])
+
+    """
+
+    def derivative(x, *args, **kwargs):
+        x = np.asarray(x, dtype=np.double)
+        if elementwise or x.ndim == 0:
+            seed = np.ones(x.shape + (1,))
+        else:
+            seed = np.eye(x.size).reshape(x.shape + (x.size,))
+
+        result = f(Dual(x, seed), *args, **kwargs)
+        if isinstance(result, Dual):
+            value, jac = result.value, result.derivative
+        else:
+            value = np.asarray(result)
+            jac = np.zeros(value.shape + seed.shape[-1:])
+
+        if elementwise or x.ndim == 0:
+            jac = jac[..., 0]
+
+        return (value, jac) if return_value else jac
+
+    return derivative
+
+
+class Dual(np.lib.mixins.NDArrayOperatorsMixin):
+    """Array of dual numbers for forward-mode automatic differentiation.
+
+    Each element holds a value :math:`v` and the derivatives :math:`\\dot v` along :math:`k`
+    directions. An operation :math:`w = g(u, v)` yields the derivatives
+    :math:`\\dot w = \\partial_u g \\, \\dot u + \\partial_v g \\, \\dot v`. Operators and
+    supported NumPy functions return dual numbers, while comparisons return the comparison of
+    the values. Unsupported functions raise a :class:`TypeError`.
+
+    Parameters
+    ----------
+    value : numpy.ndarray
+        Values.
+    derivative : numpy.ndarray
+        Derivatives, with a trailing axis of length :math:`k` appended to the shape of `value`.
+
+    Examples
+    --------
+    >>> x = Dual(2.0, np.array([1.0]))
+    >>> y = np.exp(x) * x
+    >>> bool(np.isclose(y.derivative[0], 3 * np.exp(2.0)))
+    True
+
+    """
+
+    def __init__(self, value, derivative):
+        """Store the values and their derivatives."""
+        self.value = np.asarray(value)
+        self.derivative = np.asarray(derivative)
+
+    @property
+    def shape(self):
+        """Shape of the values."""
+        return self.value.shape
+
+    @property
+    def ndim(self):
+        """Number of dimensions of the values."""
+        return self.value.ndim
+
+    @property
+    def size(self):
+        """Number of values."""
+        return self.value.size
+
+    def __len__(self):
+        """Length of the first axis of the values."""
+        return len(self.value)
+
+    def __getitem__(self, key):
+        """Select values and their derivatives, keeping the trailing axis of the derivatives."""
+        key = key if isinstance(key, tuple) else (key,)
+        return Dual(self.value[key], self.derivative[key + (slice(None),)])
+
+    def __repr__(self):
+        """Represent the values and derivatives."""
+        return f"Dual({self.value!r}, {self.derivative!r})"
+
+    def sum(self, axis=None):  # noqa: A003
+        """Sum the values along an axis."""
+        return np.sum(self, axis=axis)
+
+    def reshape(self, *shape):
+        """Give the values a new shape in C order, keeping the trailing axis of the derivatives."""
+        shape = shape[0] if len(shape) == 1 else shape
+        value = self.value.reshape(shape)
+        return Dual(value, self.derivative.reshape(value.shape + self.derivative.shape[-1:]))
+
+    def ravel(self):
+        """Flatten the values."""
+        return self.reshape(-1)
+
+    def flatten(self):
+        """Flatten the values into a copy."""
+        flat = self.reshape(-1)
+        return Dual(flat.value.copy(), flat.derivative.copy())
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """Apply a ufunc to the values and the chain rule to the derivatives.
+
+        In-place operators such as ``+=`` rebind the values and derivatives of the dual number.
+
+        """
+        out = kwargs.pop("out", (None,))
+        if method != "__call__" or kwargs or not isinstance(out[0], (Dual, type(None))):
+            return NotImplemented
+
+        values = [x.value if isinstance(x, Dual) else np.asarray(x) for x in inputs]
+        if ufunc in _COMPARISONS:
+            return ufunc(*values)
+
+        if ufunc is np.matmul:
+            result = _matmul(*inputs)
+            if result is NotImplemented:
+                return NotImplemented
+            value, derivative = result.value, result.derivative
+        elif ufunc in _PARTIALS:
+            value = ufunc(*values)
+            derivative = 0
+            for x, partial in zip(inputs, _PARTIALS[ufunc]):
+                if isinstance(x, Dual):
+                    derivative = (
+                        derivative + partial(value, *values)[..., np.newaxis] * x.derivative
+                    )
+            derivative = np.broadcast_to(derivative, value.shape + derivative.shape[-1:])
+        else:
+            return NotImplemented
+
+        if out[0] is None:
+            return Dual(value, derivative)
+
+        out[0].value, out[0].derivative = value, derivative
+        return out[0]
+
+    def __array_function__(self, func, types, args, kwargs):  # noqa: U100
+        """Apply a supported NumPy function to the values and their derivatives."""
+        if func not in _FUNCTIONS:
+            return NotImplemented
+
+        return _FUNCTIONS[func](*args, **kwargs)
+
+
+def _as_dual(x, k):
+    """Convert a constant to a dual number with zero derivatives along k directions."""
+    if isinstance(x, Dual):
+        return x
+
+    x = np.asarray(x)
+    return Dual(x, np.zeros(x.shape + (k,)))
+
+
+def _atleast_1d(x):
+    """Support :func:`numpy.atleast_1d` for a single dual number."""
+    return x if x.ndim > 0 else x[np.newaxis]
+
+
+def _stack(arrays, axis=0):
+    """Support :func:`numpy.stack` for dual numbers and constants."""
+    k = next(x.derivative.shape[-1] for x in arrays if isinstance(x, Dual))
+    arrays = [_as_dual(x, k) for x in arrays]
+    axis = axis if axis >= 0 else axis + arrays[0].ndim + 1
+
+    value = np.stack([x.value for x in arrays], axis)
+    derivative = np.stack([np.broadcast_to(x.derivative, x.shape + (k,)) for x in arrays], axis)
+    return Dual(value, derivative)
+
+
+def _matmul(a, b):
+    """Support the matrix product of vectors and matrices for dual numbers and constants.
+
+    The derivative of :math:`AB` is :math:`\\dot A B + A \\dot B`, where the products contract
+    the last axis of :math:`A` with the first axis of :math:`B`.
+
+    """
+    a_value = a.value if isinstance(a, Dual) else np.asarray(a)
+    b_value = b.value if isinstance(b, Dual) else np.asarray(b)
+    if not (1 <= a_value.ndim <= 2 and 1 <= b_value.ndim <= 2):
+        return NotImplemented
+
+    derivative = 0
+    if isinstance(a, Dual):
+        product = np.tensordot(a.derivative, b_value, axes=([a_value.ndim - 1], [0]))
+        derivative = derivative + np.moveaxis(product, a_value.ndim - 1, -1)
+    if isinstance(b, Dual):
+        derivative = derivative + np.tensordot(a_value, b.derivative, axes=([-1], [0]))
+
+    return Dual(a_value @ b_value, derivative)
+
+
+def _reshape(a, newshape):
+    """Support :func:`numpy.reshape` for a dual number."""
+    return a.reshape(newshape)
+
+
+def _meshgrid(*xi, indexing="xy"):
+    """Support :func:`numpy.meshgrid` for vectors of dual numbers and constants."""
+    k = next(x.derivative.shape[-1] for x in xi if isinstance(x, Dual))
+    xi = [_as_dual(x, k) for x in xi]
+
+    axes = list(range(len(xi)))
+    if indexing == "xy" and len(xi) > 1:
+        axes[0], axes[1] = 1, 0
+    shape = [0] * len(xi)
+    for x, axis in zip(xi, axes):
+        shape[axis] = x.size
+
+    grids = []
+    for x, axis in zip(xi, axes):
+        sizes = [1] * len(xi)
+        sizes[axis] = x.size
+        grids.append(
+            Dual(
+                np.broadcast_to(x.value.reshape(sizes), shape),
+                np.broadcast_to(x.derivative.reshape(sizes + [k]), shape + [k]),
+            )
+        )
+
+    return grids
+
+
+def _sum(x, axis=None):
+    """Support :func:`numpy.sum` for a dual number."""
+    if axis is None:
+        axis = tuple(range(x.ndim))
+    elif isinstance(axis, int) and axis < 0:
+        axis += x.ndim
+
+    return Dual(np.sum(x.value, axis), np.sum(x.derivative, axis))
+
+
+# Partial derivatives of each ufunc with respect to its inputs, given its value and inputs.
+_PARTIALS = {
+    np.add: (lambda w, u, v: np.ones_like(w), lambda w, u, v: np.ones_like(w)),  # noqa: U100
+    np.subtract: (lambda w, u, v: np.ones_like(w), lambda w, u, v: -np.ones_like(w)),  # noqa: U100
+    np.multiply: (lambda w, u, v: v, lambda w, u, v: u),  # noqa: U100
+    np.true_divide: (lambda w, u, v: 1 / v, lambda w, u, v: -w / v),  # noqa: U100
+    np.power: (lambda w, u, v: v * u ** (v - 1), lambda w, u, v: w * np.log(u)),  # noqa: U100
+    np.negative: (lambda w, u: -np.ones_like(w),),  # noqa: U100
+    np.positive: (lambda w, u: np.ones_like(w),),  # noqa: U100
+    np.absolute: (lambda w, u: np.sign(u),),  # noqa: U100
+    np.exp: (lambda w, u: w,),  # noqa: U100
+    np.log: (lambda w, u: 1 / u,),  # noqa: U100
+    np.sqrt: (lambda w, u: 1 / (2 * w),),  # noqa: U100
+    np.cbrt: (lambda w, u: 1 / (3 * w ** 2),),  # noqa: U100
+    np.sin: (lambda w, u: np.cos(u),),  # noqa: U100
+    np.cos: (lambda w, u: -np.sin(u),),  # noqa: U100
+}
+
+_COMPARISONS = {
+    np.equal,
+    np.not_equal,
+    np.less,
+    np.less_equal,
+    np.greater,
+    np.greater_equal,
+}
+
+_FUNCTIONS = {
+    np.atleast_1d: _atleast_1d,
+    np.dot: _matmul,
+    np.meshgrid: _meshgrid,
+    np.reshape: _reshape,
+    np.stack: _stack,
+    np.sum: _sum,
+}
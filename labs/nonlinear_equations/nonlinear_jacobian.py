@@ -0,0 +1,129 @@
+"""This module contains the finite difference Jacobians for the nonlinear equations lab.
+
+The materials follow Nocedal and Wright (2006, :cite:`nocedal2006numerical`) (Chapter 8). Each
+column of the Jacobian is approximated by the change in the function value along a small step
+in the corresponding coordinate. If the function is vectorized, all perturbed points are stacked
+and evaluated in a single call. If the sparsity pattern of the Jacobian is known, columns without
+common nonzero rows are perturbed together (Curtis, Powell, and Reid, 1974,
+:cite:`curtis1974estimation`), so that a banded Jacobian requires only as many evaluations as
+its bandwidth.
+
+"""
+import numpy as np
+from scipy import sparse
+
+from labs.linear_equations.linear_algorithms import get_coloring
+
+
+def get_jacobian(f, x, fx=None, method="forward", sparsity=None, vectorized=False):
+    """Approximate the Jacobian of a function by finite differences.
+
+    The forward difference :math:`(f(x + he_j) - f(x)) / h` has an error of order :math:`h`
+    and the central difference :math:`(f(x + he_j) - f(x - he_j)) / 2h` of order :math:`h^2`,
+    while rounding errors limit how small :math:`h` can be chosen. The complex step
+    :math:`\\operatorname{Im} f(x + ihe_j) / h` involves no subtraction and is thus accurate to
+    machine precision, but requires a function that accepts complex arguments.
+
+    Parameters
+    ----------
+    f : callable
+        Function :math:`f(x)` that returns a vector of length :math:`m` for a vector of length
+        :math:`n`. If `vectorized` is True, it returns a matrix of dimension :math:`k \\times m`
+        for a matrix of :math:`k` points of dimension :math:`k \\times n`.
+    x : float or numpy.ndarray
+        Point at which the Jacobian is evaluated.
+    fx : numpy.ndarray, default None
+        Function value at :math:`x`, which saves an evaluation for forward differences.
+    method : str
+        Method, one of "forward", "central", or "complex".
+    sparsity : numpy.ndarray or scipy.sparse.spmatrix, default None
+        Sparsity pattern of the Jacobian of dimension :math:`m \\times n`, whose nonzero
+        elements mark the elements of the Jacobian that may be nonzero.
+    vectorized : bool
+        Whether :math:`f` evaluates a stack of points in a single call.
+
+    Returns
+    -------
+    jacobian : numpy.ndarray or scipy.sparse.csr_matrix
+        Jacobian of dimension :math:`m \\times n`, in CSR format if `sparsity` is a sparse
+        matrix.
+
+    Example
+    -------
+    >>> jacobian = get_jacobian(np.exp, np.array([0.0, 1.0]), method="complex")
+    >>> np.allclose(jacobian, np.diag(np.exp([0.0, 1.0])))
+    True
+
+    """
+    if method not in ["forward", "central", "complex"]:
+        raise ValueError(f"Unknown method: {method}.")
+
+    x = np.atleast_1d(np.asarray(x, dtype=np.double))
+
+    if method == "forward":
+        h = np.sqrt(np.spacing(1.0)) * np.maximum(np.abs(x), 1)
+    elif method == "central":
+        h = np.cbrt(np.spacing(1.0)) * np.maximum(np.abs(x), 1)
+    else:
+        h = np.full(x.shape, 1e-20)
+
+    # Each color combines columns that can be perturbed together.
+    colors = np.arange(x.size) if sparsity is None else get_column_coloring(sparsity)
+    directions = np.zeros((colors.max() + 1, x.size))
+    directions[colors, np.arange(x.size)] = h
+
+    def evaluate(points):
+        if vectorized:
+            return np.reshape(f(points), (len(points), -1))
+        return np.array([np.atleast_1d(f(point)) for point in points])
+
+    if method == "forward" and fx is None:
+        values = evaluate(np.vstack([x, x + directions]))
+        differences = values[1:] - values[0]
+    elif method == "forward":
+        differences = evaluate(x + directions) - np.atleast_1d(fx)
+    elif method == "central":
+        values = evaluate(np.vstack([x + directions, x - directions]))
+        differences = (values[: len(directions)] - values[len(directions) :]) / 2
+    else:
+        differences = evaluate(x + 1j * directions).imag
+
+    # Each column is recovered from the difference of its color at the rows of its pattern.
+    if sparsity is None:
+        return differences.T / h
+
+    if sparse.issparse(sparsity):
+        rows, columns = sparse.coo_matrix(sparsity).nonzero()
+        data = differences[colors[columns], rows] / h[columns]
+        return sparse.csr_matrix((data, (rows, columns)), shape=sparsity.shape)
+
+    return np.where(np.asarray(sparsity) != 0, differences[colors].T / h, 0)
+
+
+def get_column_coloring(sparsity):
+    """Color the columns of a sparsity pattern for the approximation of a sparse Jacobian.
+
+    Columns of the same color do not share a nonzero row and can thus be perturbed together. The
+    coloring is computed greedily by :func:`get_coloring` on the pattern of :math:`S^T S`, which
+    couples columns that share a row. A banded pattern with :math:`l` subdiagonals and :math:`u`
+    superdiagonals requires :math:`l + u + 1` colors.
+
+    Parameters
+    ----------
+    sparsity : numpy.ndarray or scipy.sparse.spmatrix
+        Sparsity pattern of dimension :math:`m \\times n`.
+
+    Returns
+    -------
+    colors : numpy.ndarray
+        Color of each column, numbered from zero. Vector of length :math:`n`.
+
+    Example
+    -------
+    >>> get_column_coloring(np.eye(4) + np.eye(4, k=1))
+    array([0, 1, 0, 1])
+
+    """
+    pattern = abs(sparse.csr_matrix(sparsity)).astype(bool).astype(np.double)
+
+    return get_coloring(pattern.T @ pattern)
@@ -1,10 +1,11 @@
 """Plots for nonlinear equations lab."""
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.optimize import root
 
+from labs.nonlinear_equations.nonlinear_algorithms import broyden
 from labs.nonlinear_equations.nonlinear_algorithms import funcit
 from labs.nonlinear_equations.nonlinear_algorithms import newton_method
+from labs.nonlinear_equations.nonlinear_autodiff import autodiff
 
 
 def plot_bisection_test_function(f):
@@ -71,7 +72,7 @@ def plot_convergence():
 
     # Broyden
     x_values = []
-    _ = root(f, 2.0, method="broyden1", options={"jac_options": {"alpha": -1 / np.exp(2)}})
+    _ = broyden(f, 2.0, inverse_jacobian=np.exp(-2))
     error_broyden = get_log_error(x_values)
 
     # Function iteration
@@ -106,8 +107,7 @@ def plot_newtons_method():
     CompEcon toolbox. 2020. URL: https://github.com/randall-romero/CompEcon.
     """
     # Define function for illustration.
-    def f(x):
-        return x ** 5 - 3, 5 * x ** 4
+    f = autodiff(lambda x: x ** 5 - 3, elementwise=True)
 
     # Set axis limits and get function values.
     xmin, xmax = 1.0, 2.55
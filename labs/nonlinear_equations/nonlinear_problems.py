@@ -1,6 +1,8 @@
 """Problems for nonlinear equations lab."""
 import numpy as np
-from scipy import optimize
+from scipy import sparse
+
+from labs.nonlinear_equations.nonlinear_jacobian import get_jacobian
 
 
 def function_iteration_test_function(x):
@@ -13,9 +15,16 @@ def bisection_test_function(x):
     return x ** 3 - 2
 
 
-def newton_pathological_example_fjac(x, f):
-    """Get Newton Pathological example jacobian."""
-    return [optimize.approx_fprime(x[0], f, 1e-6)]
+def newton_pathological_example_fjac(x, f, fx=None):
+    """Get Newton Pathological example jacobian.
+
+    The function applies elementwise, so its Jacobian is diagonal and a single perturbation of
+    all elements at once yields its diagonal.
+
+    """
+    x = np.atleast_1d(x)
+    sparsity = sparse.identity(x.size, format="csr")
+    return get_jacobian(f, x, fx, sparsity=sparsity, vectorized=True).diagonal()
 
 
 def newton_pathological_example_fval(x):
@@ -26,7 +35,7 @@ def newton_pathological_example_fval(x):
 def newton_pathological_example(x):
     """Get Newton Pathological example."""
     fval = newton_pathological_example_fval(x)
-    fjac = newton_pathological_example_fjac(x, newton_pathological_example_fval)
+    fjac = newton_pathological_example_fjac(x, newton_pathological_example_fval, fval)
     return fval, fjac
 
 
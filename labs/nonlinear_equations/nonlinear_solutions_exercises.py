@@ -3,11 +3,11 @@ from functools import partial
 
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy import optimize
 
 from labs.nonlinear_equations.nonlinear_algorithms import bisect
+from labs.nonlinear_equations.nonlinear_algorithms import broyden
 from labs.nonlinear_equations.nonlinear_algorithms import fixpoint
-from labs.nonlinear_equations.nonlinear_algorithms import newton_method
+from labs.nonlinear_equations.nonlinear_algorithms import newton_method_batched
 from labs.nonlinear_equations.nonlinear_problems import bisection_test_function
 from labs.nonlinear_equations.nonlinear_problems import get_cournot_problem
 from labs.nonlinear_equations.nonlinear_problems import newton_pathological_example
@@ -62,9 +62,9 @@ def test_exercise_3():
 
 def test_exercise_4():
     """Test for exercise 4."""
-    for x0 in [-0.01, 0.01]:
-        x = newton_method(newton_pathological_example, 0.45)
-        print(f"candidate for root {x[0][0]:+5.3f}")
+    x, _, _ = newton_method_batched(newton_pathological_example, np.array([-0.01, 0.01]))
+    for candidate in x:
+        print(f"candidate for root {candidate:+5.3f}")
 
 
 def test_excerise_5():
@@ -73,4 +73,5 @@ def test_excerise_5():
     cournot_p = partial(get_cournot_problem, alpha, beta)
 
     x0 = [0.8, 0.2]
-    optimize.root(cournot_p, x0, method="broyden1")
+    x = broyden(cournot_p, x0)
+    np.testing.assert_almost_equal(cournot_p(x), 0)